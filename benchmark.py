@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for Flight Deal Bot
+
+Runs the full check_prices pipeline against the local fake Amadeus
+server, so throughput and scaling can be measured without using real
+API quota. Emails are suppressed and a throwaway database is used.
+
+Usage:
+    python benchmark.py --runs 3 --latency-ms 200 --concurrency 8
+    python benchmark.py --cassette data/cassettes/amadeus.json
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.config import get_config
+from src.fake_amadeus import FakeAmadeusServer
+from src.replay import Cassette
+from src.scheduler import FlightBot
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description='Benchmark check_prices against a fake Amadeus server')
+    parser.add_argument('--config', default='config.yaml', help='Base configuration file')
+    parser.add_argument('--runs', type=int, default=3, help='Number of check_prices runs')
+    parser.add_argument('--concurrency', type=int, help='Override advanced.max_concurrent_searches')
+    parser.add_argument('--cassette', help='Serve recorded responses from this cassette file')
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--latency-jitter-ms', type=float, default=50)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    server = FakeAmadeusServer(
+        port=0,
+        cassette=Cassette(args.cassette) if args.cassette else None,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+    server.start()
+
+    # Point the bot at the fake server and a throwaway database
+    config = get_config(args.config)
+    config.config['api']['client_options'] = {'host': 'localhost', 'port': server.port, 'ssl': False}
+    config.config['api']['replay'] = {'mode': 'off'}
+    config.config['api']['cache'] = {'enabled': False}
+    config.config.setdefault('advanced', {})
+    scratch_dir = Path(tempfile.mkdtemp())
+    config.config['api']['token_cache'] = {'path': str(scratch_dir / 'token.json')}
+    config.config['advanced']['database_path'] = str(scratch_dir / 'benchmark.db')
+    config.config['advanced']['send_error_notifications'] = False
+    if args.concurrency:
+        config.config['advanced']['max_concurrent_searches'] = args.concurrency
+
+    bot = FlightBot(args.config)
+    bot.email._send_email = lambda *a, **kw: None
+
+    try:
+        timings = []
+        for run in range(args.runs):
+            requests_before = server.requests_served
+            start = time.perf_counter()
+            bot.check_prices()
+            elapsed = time.perf_counter() - start
+            timings.append(elapsed)
+
+            print(
+                f"Run {run + 1}: {elapsed:.2f}s, "
+                f"{server.requests_served - requests_before} API requests"
+            )
+
+        print(f"\nBest: {min(timings):.2f}s  Mean: {sum(timings) / len(timings):.2f}s")
+    finally:
+        bot.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
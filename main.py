@@ -12,8 +12,9 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.scheduler import run_once, run_continuous, FlightBot
+from src.scheduler import run_once, run_continuous, run_maintenance, FlightBot
 from src.config import get_config
+from src.database import Database
 
 
 # Configure logging
@@ -58,6 +59,9 @@ def setup_logging(verbose: bool = False):
         handlers=[file_handler, console_handler]
     )
 
+    # httpx logs every request at INFO (the pooled Amadeus transport)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
 
 def main():
     """Main entry point"""
@@ -70,6 +74,9 @@ Examples:
   python main.py --once             # Run once and exit
   python main.py --test             # Test mode (no emails sent)
   python main.py --test-email       # Send test email
+  python main.py --maintenance      # Roll up old history and reclaim space
+  python main.py --check-db         # Verify hot queries use indexes
+  python main.py --export           # Export price history to Parquet (data/export)
   python main.py --verbose          # Enable debug logging
   python main.py --config custom.yaml  # Use custom config file
         """
@@ -93,6 +100,26 @@ Examples:
         help='Send a test email to verify configuration'
     )
 
+    parser.add_argument(
+        '--maintenance',
+        action='store_true',
+        help='Run database maintenance (roll-ups, incremental vacuum) and exit'
+    )
+
+    parser.add_argument(
+        '--check-db',
+        action='store_true',
+        help='Check that hot database queries use indexes (exit 1 if any scans)'
+    )
+
+    parser.add_argument(
+        '--export',
+        nargs='?',
+        const='data/export',
+        metavar='DIR',
+        help='Export price history to partitioned Parquet files and exit (default: data/export)'
+    )
+
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -121,7 +148,7 @@ Examples:
         try:
             config = get_config(args.config)
             logger.info(f"Configuration loaded from: {args.config}")
-            logger.info(f"Origin: {config.origin}")
+            logger.info(f"Origins: {', '.join(config.origins)}")
             logger.info(f"Destinations: {', '.join(config.destinations)}")
             logger.info(f"Check frequency: Every {config.check_frequency_hours} hours")
         except FileNotFoundError:
@@ -147,6 +174,44 @@ Examples:
 
             sys.exit(0)
 
+        # Query plan check
+        if args.check_db:
+            db = Database(db_path=config.database_path)
+            regressions = db.check_query_plans()
+            db.close()
+
+            for name, plan in regressions.items():
+                logger.error(f"❌ {name} scans a table: {'; '.join(plan)}")
+
+            if regressions:
+                sys.exit(1)
+
+            logger.info("✅ All hot queries use indexes")
+            sys.exit(0)
+
+        # Parquet export
+        if args.export:
+            from src.export import ParquetExporter
+
+            logger.info(f"Exporting price history to {args.export}...")
+            db = Database(db_path=config.database_path)
+            try:
+                counts = ParquetExporter(db, output_dir=args.export).export_all()
+            finally:
+                db.close()
+
+            for table, rows in counts.items():
+                logger.info(f"  {table}: {rows} rows")
+            logger.info("✅ Export complete!")
+            sys.exit(0)
+
+        # Database maintenance
+        if args.maintenance:
+            logger.info("Running database maintenance...")
+            run_maintenance(args.config)
+            logger.info("✅ Maintenance complete!")
+            sys.exit(0)
+
         # Test mode
         if args.test:
             logger.info("🧪 Running in TEST mode (no emails will be sent)")
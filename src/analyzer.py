@@ -3,9 +3,12 @@ Price analyzer - determines if a price is a good deal
 """
 
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from src.database import Database
 from src.config import Config
+from src.models import FlightOffer
+from src.price_calendar import PriceCalendar
+from src.sketch import KLLSketch
 
 logger = logging.getLogger(__name__)
 
@@ -16,8 +19,43 @@ class PriceAnalyzer:
     def __init__(self, database: Database, config: Config):
         self.db = database
         self.config = config
+        # route -> (database route version, 30-day stats, 90-day stats, 90-day sketch)
+        self._stats_cache: Dict[str, Tuple[int, Dict[str, float], Dict[str, float], KLLSketch]] = {}
     
-    def analyze_offer(self, offer: Dict[str, Any]) -> Dict[str, Any]:
+    def reset_cache(self):
+        """Forget cached route statistics (call at the start of each run)"""
+        self._stats_cache = {}
+    
+    def _get_route_statistics(
+        self,
+        route: str
+    ) -> Tuple[Dict[str, float], Dict[str, float], KLLSketch]:
+        """
+        Get 30- and 90-day statistics and a 90-day price sketch for a route,
+        reusing them until new price checks for the route are written
+        """
+        version = self.db.route_version(route)
+        cached = self._stats_cache.get(route)
+        
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2], cached[3]
+        
+        windows = self.db.get_price_statistics_windows(route, [30, 90])
+        sketch = self.db.get_price_sketch(route, days=90)
+        self._stats_cache[route] = (version, windows[30], windows[90], sketch)
+        
+        return windows[30], windows[90], sketch
+    
+    def _get_percentile(self, price: float, sketch: KLLSketch) -> Optional[float]:
+        """Share (0-100) of recent fares on the route at or below this price"""
+        min_samples = self.config.get('price_alerts.percentile_min_samples', 20)
+        
+        if sketch.count < min_samples:
+            return None
+        
+        return sketch.rank(price) * 100
+    
+    def analyze_offer(self, offer: FlightOffer) -> Dict[str, Any]:
         """
         Analyze a flight offer to determine if it's a deal
         
@@ -27,18 +65,19 @@ class PriceAnalyzer:
         Returns:
             Analysis results with deal quality and recommendation
         """
-        route = f"{offer['origin']}-{offer['destination']}"
-        price = offer['price']
+        route = offer.route
+        price = offer.price
         
         # Get historical statistics
-        stats_30d = self.db.get_price_statistics(route, days=30)
-        stats_90d = self.db.get_price_statistics(route, days=90)
+        stats_30d, stats_90d, sketch = self._get_route_statistics(route)
+        percentile = self._get_percentile(price, sketch)
         
         # Determine deal quality
         deal_quality = self._determine_deal_quality(
             price=price,
             stats_30d=stats_30d,
-            stats_90d=stats_90d
+            stats_90d=stats_90d,
+            percentile=percentile
         )
         
         # Calculate discount percentage
@@ -56,24 +95,28 @@ class PriceAnalyzer:
         return {
             'route': route,
             'price': price,
-            'currency': offer['currency'],
+            'currency': offer.currency,
             'deal_quality': deal_quality,
             'discount_percent': discount_percent,
             'should_alert': should_alert,
             'stats_30d': stats_30d,
             'stats_90d': stats_90d,
-            'comparison': self._generate_comparison(price, stats_30d, stats_90d)
+            'comparison': self._generate_comparison(price, stats_30d, stats_90d, percentile)
         }
     
     def _determine_deal_quality(
         self,
         price: float,
         stats_30d: Dict[str, float],
-        stats_90d: Dict[str, float]
+        stats_90d: Dict[str, float],
+        percentile: Optional[float] = None
     ) -> str:
         """
         Determine the quality of a deal
         
+        A price can qualify on its discount from the 30-day average or, if
+        percentile thresholds are configured, on its rank among recent fares.
+        
         Returns:
             'amazing', 'great', 'good', or 'average'
         """
@@ -92,28 +135,50 @@ class PriceAnalyzer:
         if stats_30d['avg']:
             discount_percent = ((stats_30d['avg'] - price) / stats_30d['avg']) * 100
         
+        # Relative conditions: discount or (optionally) percentile rank
+        amazing_relative = self._is_relative_deal('amazing', discount_percent, amazing_percent, percentile)
+        great_relative = self._is_relative_deal('great', discount_percent, great_percent, percentile)
+        good_relative = self._is_relative_deal('good', discount_percent, good_percent, percentile)
+        
         # Determine quality
         require_both = self.config.get('price_alerts.require_both_conditions', False)
         
         if require_both:
             # Must meet BOTH price AND percentage
-            if price <= amazing_price and discount_percent >= amazing_percent:
+            if price <= amazing_price and amazing_relative:
                 return 'amazing'
-            elif price <= great_price and discount_percent >= great_percent:
+            elif price <= great_price and great_relative:
                 return 'great'
-            elif price <= good_price and discount_percent >= good_percent:
+            elif price <= good_price and good_relative:
                 return 'good'
         else:
             # Meets EITHER condition
-            if price <= amazing_price or discount_percent >= amazing_percent:
+            if price <= amazing_price or amazing_relative:
                 return 'amazing'
-            elif price <= great_price or discount_percent >= great_percent:
+            elif price <= great_price or great_relative:
                 return 'great'
-            elif price <= good_price or discount_percent >= good_percent:
+            elif price <= good_price or good_relative:
                 return 'good'
         
         return 'average'
     
+    def _is_relative_deal(
+        self,
+        level: str,
+        discount_percent: float,
+        min_discount_percent: float,
+        percentile: Optional[float]
+    ) -> bool:
+        """
+        Check a deal level's relative condition: a big enough discount, or a
+        rank within the configured percentile (e.g. 5 = cheapest 5% of fares)
+        """
+        if discount_percent >= min_discount_percent:
+            return True
+        
+        max_percentile = self.config.get(f'price_alerts.percentile_thresholds.{level}_deal_percentile')
+        return max_percentile is not None and percentile is not None and percentile <= max_percentile
+    
     def _should_alert(
         self,
         price: float,
@@ -154,7 +219,8 @@ class PriceAnalyzer:
         self,
         price: float,
         stats_30d: Dict[str, float],
-        stats_90d: Dict[str, float]
+        stats_90d: Dict[str, float],
+        percentile: Optional[float] = None
     ) -> Dict[str, Any]:
         """Generate price comparison text"""
         comparison = {
@@ -162,7 +228,7 @@ class PriceAnalyzer:
             'vs_30d_avg': None,
             'vs_90d_avg': None,
             'vs_30d_min': None,
-            'percentile': None
+            'percentile': percentile
         }
         
         if stats_30d['avg']:
@@ -194,12 +260,14 @@ class PriceAnalyzer:
     
     def get_best_offers(
         self,
-        offers: List[Dict[str, Any]],
+        offers: List[FlightOffer],
         limit: int = 5
-    ) -> List[Dict[str, Any]]:
+    ) -> List[FlightOffer]:
         """
         Analyze multiple offers and return the best ones
         
+        Offers that already carry an analysis are not analyzed again.
+        
         Args:
             offers: List of flight offers
             limit: Maximum number of offers to return
@@ -207,29 +275,48 @@ class PriceAnalyzer:
         Returns:
             List of best offers with analysis
         """
-        analyzed_offers = []
-        
         for offer in offers:
-            analysis = self.analyze_offer(offer)
-            
-            analyzed_offers.append({
-                **offer,
-                'analysis': analysis
-            })
+            if offer.analysis is None:
+                offer.analysis = self.analyze_offer(offer)
         
         # Sort by deal quality and price
         quality_order = {'amazing': 0, 'great': 1, 'good': 2, 'average': 3}
         
-        analyzed_offers.sort(
+        return sorted(
+            offers,
             key=lambda x: (
-                quality_order.get(x['analysis']['deal_quality'], 99),
-                x['price']
+                quality_order.get(x.analysis['deal_quality'], 99),
+                x.price
             )
-        )
+        )[:limit]
+    
+    def get_best_calendar_offers(
+        self,
+        calendar: PriceCalendar,
+        limit: int = 5,
+        within_percent: Optional[float] = None
+    ) -> List[FlightOffer]:
+        """
+        Analyze the cheapest offer of each calendar cell and return the best ones
         
-        return analyzed_offers[:limit]
+        Args:
+            calendar: Price calendar from a flexible-date search
+            limit: Maximum number of offers to return
+            within_percent: If set, only analyze cells priced within this
+                percentage of the calendar's cheapest fare
+        
+        Returns:
+            List of best offers with analysis
+        """
+        if within_percent is None:
+            within_percent = float('inf')
+        
+        return self.get_best_offers(
+            calendar.offers_within_percent_of_best(within_percent),
+            limit=limit
+        )
     
-    def should_send_alert_email(self, analyzed_offers: List[Dict[str, Any]]) -> bool:
+    def should_send_alert_email(self, analyzed_offers: List[FlightOffer]) -> bool:
         """
         Determine if any email alert should be sent
         
@@ -240,15 +327,15 @@ class PriceAnalyzer:
             True if should send alert email
         """
         for offer in analyzed_offers:
-            if offer['analysis']['should_alert']:
+            if offer.analysis['should_alert']:
                 return True
         
         return False
     
     def get_alertable_offers(
         self,
-        analyzed_offers: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
+        analyzed_offers: List[FlightOffer]
+    ) -> List[FlightOffer]:
         """
         Filter offers to only those that should trigger alerts
         
@@ -260,5 +347,5 @@ class PriceAnalyzer:
         """
         return [
             offer for offer in analyzed_offers
-            if offer['analysis']['should_alert']
+            if offer.analysis['should_alert']
         ]
@@ -0,0 +1,134 @@
+"""
+API call budget planner - spreads the Amadeus quota across runs and searches
+"""
+
+import calendar
+import logging
+import math
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Sequence, TypeVar
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class CallBudgetPlanner:
+    """Plans how many API calls each run may use and where to spend them"""
+
+    def __init__(
+        self,
+        database: Database,
+        monthly_quota: int,
+        daily_quota: Optional[int] = None,
+        check_frequency_hours: float = 6,
+        reserve_percent: float = 10
+    ):
+        """
+        Args:
+            database: Where actual API usage is recorded
+            monthly_quota: API calls allowed per calendar month
+            daily_quota: Optional API calls allowed per day
+            check_frequency_hours: Hours between scheduled runs
+            reserve_percent: Share of the monthly quota never planned for
+                (head-room for retries and manual runs)
+        """
+        self.db = database
+        self.monthly_quota = monthly_quota
+        self.daily_quota = daily_quota
+        self.check_frequency_hours = check_frequency_hours
+        self.reserve_percent = reserve_percent
+
+    def calls_for_run(self, now: Optional[datetime] = None) -> int:
+        """
+        Number of API calls this run may use
+
+        The remaining monthly quota is spread evenly over the runs left in
+        the month, so a growing watchlist gets thinner coverage per run
+        instead of running out of quota before the month ends.
+        """
+        now = now or datetime.now()
+        runs_per_day = 24 / self.check_frequency_hours
+
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        days_in_month = calendar.monthrange(now.year, now.month)[1]
+        hours_left = (days_in_month - now.day) * 24 + (24 - now.hour - now.minute / 60)
+        runs_left_in_month = max(1, math.ceil(hours_left / self.check_frequency_hours))
+
+        usable_quota = self.monthly_quota * (1 - self.reserve_percent / 100)
+        used_this_month = self.db.get_api_usage(since=month_start)
+        budget = (usable_quota - used_this_month) / runs_left_in_month
+
+        if self.daily_quota:
+            day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            used_today = self.db.get_api_usage(since=day_start)
+            runs_left_today = max(1, math.ceil((24 - now.hour - now.minute / 60) / self.check_frequency_hours))
+            budget = min(budget, (self.daily_quota - used_today) / runs_left_today)
+
+        budget = max(0, math.floor(budget))
+        logger.info(
+            f"API budget: {budget} calls this run "
+            f"({used_this_month}/{self.monthly_quota} used this month, "
+            f"~{runs_per_day:.0f} runs/day)"
+        )
+
+        return budget
+
+    def allocate(
+        self,
+        groups: Dict[Hashable, Sequence[T]],
+        priorities: Dict[Hashable, float],
+        budget: int
+    ) -> List[T]:
+        """
+        Split a call budget across groups of tasks by priority
+
+        Each group gets a share proportional to its priority, capped at its
+        size; unused share is handed on to the other groups. Groups should
+        list their tasks most important first.
+
+        Returns:
+            The selected tasks, in group order
+        """
+        allocation = {key: 0 for key in groups}
+        remaining = budget
+
+        while remaining > 0:
+            open_groups = [key for key in groups if allocation[key] < len(groups[key])]
+            if not open_groups:
+                break
+
+            total_priority = sum(priorities.get(key, 1.0) for key in open_groups)
+            shares = {
+                key: remaining * priorities.get(key, 1.0) / total_priority
+                for key in open_groups
+            }
+
+            # Whole shares first, then leftover calls by largest remainder
+            granted = 0
+            for key in open_groups:
+                extra = min(int(shares[key]), len(groups[key]) - allocation[key])
+                allocation[key] += extra
+                granted += extra
+
+            if granted == 0:
+                for key in sorted(open_groups, key=lambda k: shares[k] - int(shares[k]), reverse=True):
+                    if granted >= remaining:
+                        break
+                    allocation[key] += 1
+                    granted += 1
+
+            remaining -= granted
+
+        selected = []
+        for key, tasks in groups.items():
+            selected.extend(tasks[:allocation[key]])
+
+        return selected
+
+    def record_usage(self, calls: int, now: Optional[datetime] = None):
+        """Record the API calls a run actually made"""
+        if calls:
+            self.db.add_api_usage(calls, now or datetime.now())
@@ -0,0 +1,188 @@
+"""
+Response cache for flight searches - in-memory LRU with optional SQLite backing
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """
+    TTL cache with LRU eviction for raw API responses
+
+    The lock only guards the in-memory LRU; the SQLite backing store is
+    read and written outside it, on one connection per thread, so worker
+    threads don't queue up behind each other's disk I/O.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 3600,
+        max_entries: int = 1000,
+        db_path: Optional[str] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.db_path = db_path
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self.hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            self._create_table()
+
+    def _create_table(self):
+        """Create the on-disk cache table and drop expired entries"""
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # Readers don't block the writer (or each other)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    stored_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+            conn.execute(
+                "DELETE FROM response_cache WHERE stored_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get this thread's connection to the backing store"""
+        conn = getattr(self._local, 'conn', None)
+
+        if conn is None:
+            # close() may run on another thread
+            conn = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+
+        return conn
+
+    def close(self):
+        """Close the backing store connections"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+
+        self._local = threading.local()
+
+    @staticmethod
+    def _make_key(key: Tuple) -> str:
+        """Turn a query tuple into a stable string key"""
+        return '|'.join(str(part) for part in key)
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """
+        Look up a cached response
+
+        Returns:
+            The cached value, or None if missing or expired
+        """
+        cache_key = self._make_key(key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(cache_key)
+
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(cache_key)
+                    self.hits += 1
+                    return value
+                del self._entries[cache_key]
+
+        entry = self._load_from_disk(cache_key, now) if self.db_path else None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._store_in_memory(cache_key, *entry)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple, value: Any):
+        """Store a response in the cache"""
+        cache_key = self._make_key(key)
+        stored_at = time.time()
+
+        with self._lock:
+            self._store_in_memory(cache_key, stored_at, value)
+
+        if self.db_path:
+            self._save_to_disk(cache_key, stored_at, value)
+
+    def _store_in_memory(self, cache_key: str, stored_at: float, value: Any):
+        """Insert into the LRU, evicting the least recently used entries"""
+        self._entries[cache_key] = (stored_at, value)
+        self._entries.move_to_end(cache_key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load_from_disk(self, cache_key: str, now: float) -> Optional[Tuple[float, Any]]:
+        """Load a fresh entry from the SQLite backing store"""
+        try:
+            row = self._get_connection().execute(
+                "SELECT stored_at, payload FROM response_cache WHERE cache_key = ?",
+                (cache_key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Response cache read failed: {e}")
+            return None
+
+        if row is None or now - row[0] > self.ttl_seconds:
+            return None
+
+        return row[0], json.loads(row[1])
+
+    def _save_to_disk(self, cache_key: str, stored_at: float, value: Any):
+        """Write an entry to the SQLite backing store"""
+        try:
+            payload = json.dumps(value)
+            with self._get_connection() as conn:  # Commits, or rolls back on error
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (cache_key, stored_at, payload) "
+                    "VALUES (?, ?, ?)",
+                    (cache_key, stored_at, payload)
+                )
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            logger.warning(f"Response cache write failed: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Get hit/miss counters"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries)
+        }
+
+    def reset_stats(self):
+        """Reset hit/miss counters (e.g. at the start of a run)"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
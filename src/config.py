@@ -68,7 +68,7 @@ class Config:
         required_fields = {
             'email': ['recipient', 'sender_gmail', 'smtp_password'],
             'api': ['amadeus_api_key', 'amadeus_api_secret'],
-            'routes': ['origin', 'destinations'],
+            'routes': ['destinations'],
         }
         
         for section, fields in required_fields.items():
@@ -86,6 +86,10 @@ class Config:
                         f"Please update {section}.{field} in config.yaml\n"
                         f"Current value appears to be a placeholder: {value}"
                     )
+        
+        routes = self.config['routes']
+        if not routes.get('origin') and not routes.get('origins'):
+            raise ValueError("Missing required field: routes.origin (or routes.origins)")
     
     # Convenience properties
     @property
@@ -110,7 +114,12 @@ class Config:
     
     @property
     def origin(self) -> str:
-        return self.config['routes']['origin']
+        return self.config['routes'].get('origin') or self.origins[0]
+    
+    @property
+    def origins(self) -> List[str]:
+        routes = self.config['routes']
+        return routes.get('origins') or [routes['origin']]
     
     @property
     def destinations(self) -> List[str]:
@@ -2,22 +2,221 @@
 Database manager for storing flight price history
 """
 
+import ast
+import json
 import logging
+import queue
 import sqlite3
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import Callable, Iterable, List, Dict, Optional, Any, Sequence, Tuple, Union
+
+from src import offer_codec
+from src.sketch import KLLSketch
 
 logger = logging.getLogger(__name__)
 
+# price_checks is split into one table per month (price_checks_YYYY_MM)
+# behind a UNION ALL view of the same name. Reads go through the view (or
+# only the partitions they need); writes go to the current month's table,
+# and expiring a month is a DROP TABLE.
+PRICE_CHECK_COLUMNS = (
+    "id, route, origin, destination, departure_date, return_date, trip_length, "
+    "price, currency, stops, airlines, connections, checked_at, offer_data, offer_hash"
+)
+PRICE_CHECK_PARTITION_GLOB = "price_checks_[0-9][0-9][0-9][0-9]_[0-9][0-9]"
+
+
+def _partition_name(when: datetime) -> str:
+    """Name of the price_checks partition holding checks made at a time"""
+    return f"price_checks_{when.strftime('%Y_%m')}"
+
+
+def _partition_start(name: str) -> datetime:
+    """First moment covered by a price_checks partition"""
+    year, month = name.rsplit('_', 2)[1:]
+    return datetime(int(year), int(month), 1)
+
+
+def _list_price_check_partitions(conn: sqlite3.Connection) -> List[str]:
+    """Names of the price_checks partitions, oldest first"""
+    rows = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB ? ORDER BY name",
+        (PRICE_CHECK_PARTITION_GLOB,)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def _create_price_check_partition(conn: sqlite3.Connection, name: str):
+    """
+    Create a price_checks partition and its indexes
+
+    Its id sequence starts after the highest id handed out so far, so ids
+    stay unique across partitions (get_offer_data looks rows up by id).
+    """
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            route VARCHAR(10) NOT NULL,
+            origin VARCHAR(3) NOT NULL,
+            destination VARCHAR(3) NOT NULL,
+            departure_date DATE NOT NULL,
+            return_date DATE NOT NULL,
+            trip_length INTEGER NOT NULL,
+            price DECIMAL(10,2) NOT NULL,
+            currency VARCHAR(3) NOT NULL,
+            stops INTEGER NOT NULL,
+            airlines TEXT,
+            connections TEXT,
+            checked_at TIMESTAMP NOT NULL,
+            offer_data TEXT,
+            offer_hash BLOB
+        )
+    """)
+
+    # Same indexes as the unpartitioned table had (see migration 1)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_route_checked_at ON {name} (route, checked_at, price)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_checked_at ON {name} (checked_at)")
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS idx_{name}_route_dates "
+        f"ON {name} (route, departure_date, return_date, trip_length, price, checked_at)"
+    )
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_offer_hash ON {name} (offer_hash)")
+
+    last_id = conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'price_checks' OR name GLOB ?",
+        (PRICE_CHECK_PARTITION_GLOB,)
+    ).fetchone()[0]
+    conn.execute(
+        "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ? "
+        "WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+        (name, last_id, name)
+    )
+
+
+def _rebuild_price_checks_view(conn: sqlite3.Connection):
+    """Point the price_checks view at the current set of partitions"""
+    partitions = _list_price_check_partitions(conn)
+
+    conn.execute("DROP VIEW IF EXISTS price_checks")
+    conn.execute("CREATE VIEW price_checks AS " + " UNION ALL ".join(
+        f"SELECT {PRICE_CHECK_COLUMNS} FROM {partition}" for partition in partitions
+    ))
+
+
+def _partition_price_checks(conn: sqlite3.Connection):
+    """Migration: move the price_checks table into monthly partitions"""
+    months = [
+        row[0] for row in conn.execute(
+            "SELECT DISTINCT strftime('%Y-%m', checked_at) FROM price_checks"
+        )
+        if row[0]
+    ]
+    partitions = {_partition_name(datetime.strptime(month, '%Y-%m')) for month in months}
+    partitions.add(_partition_name(datetime.now()))
+
+    for name in sorted(partitions):
+        _create_price_check_partition(conn, name)
+
+    for name in sorted(partitions):
+        start = _partition_start(name)
+        end = (start + timedelta(days=32)).replace(day=1)
+        conn.execute(f"""
+            INSERT INTO {name} ({PRICE_CHECK_COLUMNS})
+            SELECT {PRICE_CHECK_COLUMNS} FROM price_checks
+            WHERE checked_at >= ? AND checked_at < ?
+        """, (start, end))
+
+    conn.execute("DROP TABLE price_checks")
+    _rebuild_price_checks_view(conn)
+
+
+# Schema migrations, applied in order. PRAGMA user_version records how
+# many have run, so each one is applied exactly once per database. A step
+# is either SQL or a function taking the connection.
+MIGRATIONS: List[List[Union[str, Callable[[sqlite3.Connection], None]]]] = [
+    # 1: indexes for the hot queries
+    [
+        # get_price_statistics (covering: no table lookups)
+        "CREATE INDEX IF NOT EXISTS idx_price_checks_route_checked_at "
+        "ON price_checks (route, checked_at, price)",
+        # cleanup_old_data range aggregation/deletes
+        "CREATE INDEX IF NOT EXISTS idx_price_checks_checked_at "
+        "ON price_checks (checked_at)",
+        # Per date-pair history (prefilter, sampler, staleness)
+        "CREATE INDEX IF NOT EXISTS idx_price_checks_route_dates "
+        "ON price_checks (route, departure_date, return_date, trip_length, price, checked_at)",
+        "CREATE INDEX IF NOT EXISTS idx_deals_found_at ON deals (found_at)",
+        "CREATE INDEX IF NOT EXISTS idx_api_usage_used_at ON api_usage (used_at)",
+    ],
+    # 2: real quantiles (and the KLL sketches they come from) in the rollups
+    [
+        "ALTER TABLE daily_stats ADD COLUMN p10_price DECIMAL(10,2)",
+        "ALTER TABLE daily_stats ADD COLUMN p25_price DECIMAL(10,2)",
+        "ALTER TABLE daily_stats ADD COLUMN sketch BLOB",
+        "ALTER TABLE monthly_stats ADD COLUMN median_price DECIMAL(10,2)",
+        "ALTER TABLE monthly_stats ADD COLUMN p10_price DECIMAL(10,2)",
+        "ALTER TABLE monthly_stats ADD COLUMN p25_price DECIMAL(10,2)",
+        "ALTER TABLE monthly_stats ADD COLUMN sketch BLOB",
+    ],
+    # 3: roll-up watermarks for incremental maintenance
+    [
+        "CREATE TABLE IF NOT EXISTS maintenance_state (key TEXT PRIMARY KEY, value TEXT)",
+    ],
+    # 4: compressed, content-addressed offer payloads
+    [
+        "CREATE TABLE IF NOT EXISTS offer_blobs (hash BLOB PRIMARY KEY, data BLOB NOT NULL) WITHOUT ROWID",
+        "ALTER TABLE price_checks ADD COLUMN offer_hash BLOB",
+        "CREATE INDEX IF NOT EXISTS idx_price_checks_offer_hash ON price_checks (offer_hash)",
+    ],
+    # 5: monthly price_checks partitions behind a view
+    [
+        _partition_price_checks,
+    ],
+    # 6: export order (route, time), so exports read in index order
+    # instead of sorting whole tables
+    [
+        "CREATE INDEX IF NOT EXISTS idx_deals_route_found_at ON deals (route, found_at)",
+        "CREATE INDEX IF NOT EXISTS idx_daily_stats_route_date ON daily_stats (route, date)",
+        "CREATE INDEX IF NOT EXISTS idx_monthly_stats_route_month ON monthly_stats (route, month)",
+    ],
+]
 
 class Database:
-    """SQLite database manager for flight prices"""
+    """
+    SQLite database manager for flight prices
+
+    Each thread gets its own long-lived connection, opened on first use
+    and reused until close(). The database runs in WAL mode, so readers in
+    worker threads don't block the writer.
+    """
     
-    def __init__(self, db_path: str = "data/flights.db"):
+    def __init__(
+        self,
+        db_path: str = "data/flights.db",
+        cache_size_kb: int = 16384,
+        mmap_size_mb: int = 128,
+        busy_timeout_ms: int = 5000
+    ):
         self.db_path = db_path
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size_mb = mmap_size_mb
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._connections_lock = threading.Lock()
+        self._route_versions: Dict[str, int] = {}
+        self._global_version = 0
+        # (route, days) -> (cutoff date, global version, sketch), kept up
+        # to date by add_price_checks; guarded by _sketch_lock
+        self._price_sketches: Dict[Tuple[str, int], Tuple[str, int, KLLSketch]] = {}
+        self._sketch_lock = threading.Lock()
+        self._partitions = set()
         self._ensure_database_exists()
         self._create_tables()
+        self._migrate()
+        self._ensure_price_check_partition(datetime.now())
         logger.info(f"Database initialized: {db_path}")
     
     def _ensure_database_exists(self):
@@ -26,17 +225,64 @@ class Database:
         db_dir.mkdir(parents=True, exist_ok=True)
     
     def _get_connection(self) -> sqlite3.Connection:
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+        """Get this thread's database connection"""
+        conn = getattr(self._local, 'conn', None)
+        
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            
+            with self._connections_lock:
+                self._close_dead_connections()
+                self._connections.append((threading.current_thread(), conn))
+        
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with WAL and tuned pragmas"""
+        # Only ever used by the thread that opened it, but close() may run
+        # on another thread
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        
+        # Only takes effect on a new, empty database (it must precede WAL
+        # setup); run_maintenance() converts existing ones
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, no fsync per commit
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size_mb) * 1024 * 1024}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        
         return conn
     
+    def _close_dead_connections(self):
+        """Close connections of threads that have exited (e.g. finished workers)"""
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                conn.close()
+        self._connections = alive
+    
+    def close(self):
+        """Close every connection opened by this Database"""
+        with self._connections_lock:
+            for _, conn in self._connections:
+                conn.close()
+            self._connections = []
+        
+        self._local = threading.local()
+    
     def _create_tables(self):
         """Create database tables if they don't exist"""
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Price checks table (detailed, recent data)
+        # Price checks table (detailed, recent data); migration 5 splits it
+        # into monthly partitions behind a view, after which this is a no-op
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS price_checks (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -103,88 +349,370 @@ class Database:
             )
         """)
 
+        # API calls made per run (for quota planning)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS api_usage (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                used_at TIMESTAMP NOT NULL,
+                calls INTEGER NOT NULL
+            )
+        """)
+
         conn.commit()
-        conn.close()
+
+    def _migrate(self):
+        """Apply pending schema migrations"""
+        conn = self._get_connection()
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+
+        for number, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            try:
+                conn.execute("BEGIN")
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f"PRAGMA user_version={number}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Database migration {number} failed: {e}")
+                raise
+
+            logger.info(f"Applied database migration {number}")
+
+    def explain_query_plan(self, sql: str, params: Tuple = ()) -> List[str]:
+        """Get the EXPLAIN QUERY PLAN steps of a query"""
+        conn = self._get_connection()
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        return [row['detail'] for row in rows]
+
+    def _hot_queries(self) -> Dict[str, Tuple[str, Tuple]]:
+        """
+        The hot queries with representative arguments, built by the same
+        methods the queries use (so month-pruned sources are included)
+        """
+        now = datetime.now()
+        route = 'WAW-GRU'
+
+        return {
+            'price_statistics': self._price_statistics_sql(route, [7, 30, 90], now),
+            'cheapest_date_pairs': self._cheapest_date_pairs_sql(
+                route, now, now + timedelta(days=30), 10, 21, 10
+            ),
+            'date_pair_history': self._date_pair_history_sql(route, now, now + timedelta(days=30)),
+            'combination_observations': self._combination_observations_sql(route, now),
+            'rollup_expired_checks': self._rollup_checks_sql(
+                now - timedelta(days=30), now - timedelta(days=60)
+            ),
+            'recent_deals': self._recent_deals_sql(10),
+            'api_usage': self._api_usage_sql(now - timedelta(days=1)),
+        }
+
+    def check_query_plans(self) -> Dict[str, List[str]]:
+        """
+        Check that no hot query falls back to a full table scan
+
+        Returns:
+            Plans of the queries that scan a table without an index
+            (empty if all are fine)
+        """
+        regressions = {}
+
+        for name, (sql, params) in self._hot_queries().items():
+            plan = self.explain_query_plan(sql, params)
+            # Reading back a view's co-routine (e.g. the price_checks
+            # partitions) shows up as a SCAN of the view; that's fine
+            subqueries = {
+                step.split(' ', 1)[1] for step in plan
+                if step.startswith(('CO-ROUTINE ', 'MATERIALIZE '))
+            }
+            if any(
+                step.startswith('SCAN') and 'INDEX' not in step and step[5:] not in subqueries
+                for step in plan
+            ):
+                regressions[name] = plan
+
+        return regressions
+
+    def price_check_partitions(self) -> List[str]:
+        """Names of the monthly price_checks tables, oldest first"""
+        return _list_price_check_partitions(self._get_connection())
+
+    def _ensure_price_check_partition(self, when: datetime) -> str:
+        """
+        Get the partition for checks made at a time, creating it if needed
+
+        Returns:
+            Partition table name
+        """
+        name = _partition_name(when)
+        if name in self._partitions:
+            return name
+
+        conn = self._get_connection()
+
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            if name not in _list_price_check_partitions(conn):
+                _create_price_check_partition(conn, name)
+                _rebuild_price_checks_view(conn)
+                logger.info(f"Created price check partition {name}")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Error creating price check partition {name}: {e}")
+            raise
+
+        self._partitions.add(name)
+        return name
+
+    def _price_checks_source(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None
+    ) -> str:
+        """
+        FROM clause over only the partitions that can hold checks made
+        between since and until (both optional)
+        """
+        partitions = [
+            partition for partition in self.price_check_partitions()
+            if (since is None or partition >= _partition_name(since))
+            and (until is None or partition <= _partition_name(until))
+        ]
+
+        if not partitions:
+            return "price_checks"
+        if len(partitions) == 1:
+            return partitions[0]
+
+        return "(" + " UNION ALL ".join(
+            f"SELECT {PRICE_CHECK_COLUMNS} FROM {partition}" for partition in partitions
+        ) + ")"
 
     def add_price_check(self, flight_data: Dict[str, Any]):
         """Add a new price check to the database"""
+        self.add_price_checks([flight_data])
+
+    def add_price_checks(self, flight_data: Iterable[Dict[str, Any]]) -> int:
+        """
+        Add many price checks in a single transaction
+
+        Raw offers go to offer_blobs, compressed and keyed by content hash,
+        so a payload that is observed again is only stored once.
+
+        Args:
+            flight_data: Price check dicts (same shape as add_price_check);
+                an optional 'checked_at' datetime records when the price was
+                observed (default: now)
+
+        Returns:
+            Number of rows inserted
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
+        now = datetime.now()
 
         try:
-            # Extract data
-            route = f"{flight_data['origin']}-{flight_data['destination']}"
+            rows = []
+            partitions: Dict[str, List[Tuple]] = {}
+            payloads: Dict[bytes, Any] = {}
 
-            cursor.execute("""
-                INSERT INTO price_checks (
-                    route, origin, destination, departure_date, return_date,
-                    trip_length, price, currency, stops, airlines, connections,
-                    checked_at, offer_data
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                route,
-                flight_data['origin'],
-                flight_data['destination'],
-                flight_data['departure_date'],
-                flight_data['return_date'],
-                flight_data['trip_length'],
-                flight_data['price'],
-                flight_data['currency'],
-                flight_data['stops'],
-                ','.join(flight_data.get('airlines', [])),
-                ','.join(flight_data.get('connections', [])),
-                datetime.now(),
-                str(flight_data.get('raw_offer', ''))
-            ))
+            for data in flight_data:
+                raw_offer = data.get('raw_offer')
+                offer_hash = None
 
-            conn.commit()
-            logger.debug(f"Added price check: {route} - {flight_data['price']} {flight_data['currency']}")
+                if raw_offer is not None:
+                    offer_hash = offer_codec.content_hash(raw_offer)
+                    payloads[offer_hash] = raw_offer
+
+                checked_at = data.get('checked_at') or now
+                row = self._price_check_row(data, checked_at, offer_hash)
+                rows.append(row)
+                partitions.setdefault(self._ensure_price_check_partition(checked_at), []).append(row)
+
+            self._store_offer_blobs(payloads)
+
+            inserted = 0
+            for partition, partition_rows in partitions.items():
+                cursor = conn.executemany(f"""
+                    INSERT INTO {partition} (
+                        route, origin, destination, departure_date, return_date,
+                        trip_length, price, currency, stops, airlines, connections,
+                        checked_at, offer_hash
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, partition_rows)
+                inserted += cursor.rowcount
+
+            # Commit under the sketch lock, so a sketch being built either
+            # sees these rows or gets them merged in, never both
+            with self._sketch_lock:
+                self._merge_into_price_sketches(rows)
+                conn.commit()
+
+            self._bump_route_versions({row[0] for row in rows})
+            logger.debug(f"Added {inserted} price checks ({len(payloads)} distinct offers)")
+            return inserted
 
         except Exception as e:
-            logger.error(f"Error adding price check: {e}")
+            logger.error(f"Error adding price checks: {e}")
             conn.rollback()
-        finally:
-            conn.close()
+            with self._sketch_lock:
+                self._price_sketches.clear()  # May hold rows that were rolled back
+            return 0
+
+    def _merge_into_price_sketches(self, rows: List[Tuple]):
+        """Add newly inserted price_checks rows to the cached route sketches"""
+        if not self._price_sketches:
+            return
+
+        prices: Dict[str, List[float]] = {}
+        for row in rows:
+            prices.setdefault(row[0], []).append(row[6])
+
+        for (route, _), (_, _, sketch) in self._price_sketches.items():
+            if route in prices:
+                sketch.extend(prices[route])
+
+    @staticmethod
+    def _price_check_row(
+        flight_data: Dict[str, Any],
+        checked_at: datetime,
+        offer_hash: Optional[bytes]
+    ) -> Tuple:
+        """Convert a price check dict into a price_checks row"""
+        return (
+            f"{flight_data['origin']}-{flight_data['destination']}",
+            flight_data['origin'],
+            flight_data['destination'],
+            flight_data['departure_date'],
+            flight_data['return_date'],
+            flight_data['trip_length'],
+            flight_data['price'],
+            flight_data['currency'],
+            flight_data['stops'],
+            ','.join(flight_data.get('airlines', [])),
+            ','.join(flight_data.get('connections', [])),
+            checked_at,
+            offer_hash
+        )
+
+    def _store_offer_blobs(self, payloads: Dict[bytes, Any]):
+        """Encode and insert the payloads not already in offer_blobs"""
+        conn = self._get_connection()
+        hashes = list(payloads)
+        existing = set()
+
+        # Skip encoding payloads that are already stored
+        for i in range(0, len(hashes), 500):
+            chunk = hashes[i:i + 500]
+            rows = conn.execute(
+                f"SELECT hash FROM offer_blobs WHERE hash IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            existing.update(row['hash'] for row in rows)
+
+        conn.executemany(
+            "INSERT OR IGNORE INTO offer_blobs (hash, data) VALUES (?, ?)",
+            (
+                (offer_hash, offer_codec.encode(payload))
+                for offer_hash, payload in payloads.items()
+                if offer_hash not in existing
+            )
+        )
+
+    def get_offer_data(self, price_check_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Get the raw offer stored with a price check, as Python objects
+
+        Reads compressed blobs as well as the offer_data column of rows
+        written before blobs were introduced (JSON, or the old dict repr).
+        """
+        conn = self._get_connection()
+
+        row = conn.execute("""
+            SELECT price_checks.offer_data, offer_blobs.data as blob
+            FROM price_checks
+            LEFT JOIN offer_blobs ON offer_blobs.hash = price_checks.offer_hash
+            WHERE price_checks.id = ?
+        """, (price_check_id,)).fetchone()
+
+        if row is None:
+            return None
+        if row['blob'] is not None:
+            return offer_codec.decode(row['blob'])
+        if not row['offer_data']:
+            return None
+
+        try:
+            return json.loads(row['offer_data'])
+        except ValueError:
+            pass
+
+        try:
+            return ast.literal_eval(row['offer_data'])
+        except (ValueError, SyntaxError):
+            logger.warning(f"Unreadable offer_data for price check {price_check_id}")
+            return None
 
     def add_deal(self, deal_data: Dict[str, Any]):
         """Record a deal that was found"""
+        self.add_deals([deal_data])
+
+    def add_deals(self, deal_data: Iterable[Dict[str, Any]]) -> int:
+        """
+        Record many deals in a single transaction
+
+        Args:
+            deal_data: Deal dicts (same shape as add_deal); an optional
+                'found_at' datetime records when the deal was found
+                (default: now)
+
+        Returns:
+            Number of deals recorded
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
+        now = datetime.now()
 
         try:
-            route = f"{deal_data['origin']}-{deal_data['destination']}"
+            rows = [
+                (
+                    f"{deal['origin']}-{deal['destination']}",
+                    deal['origin'],
+                    deal['destination'],
+                    deal['departure_date'],
+                    deal['return_date'],
+                    deal['price'],
+                    deal['currency'],
+                    deal.get('discount_percent'),
+                    deal.get('deal_quality', 'good'),
+                    str(deal.get('outbound')),
+                    str(deal.get('inbound')),
+                    deal.get('booking_link'),
+                    deal.get('found_at') or now,
+                    deal.get('notified', False)
+                )
+                for deal in deal_data
+            ]
 
-            cursor.execute("""
+            conn.executemany("""
                 INSERT INTO deals (
                     route, origin, destination, departure_date, return_date,
                     price, currency, discount_percent, deal_quality,
                     outbound_info, inbound_info, booking_link, found_at, notified
                 ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                route,
-                deal_data['origin'],
-                deal_data['destination'],
-                deal_data['departure_date'],
-                deal_data['return_date'],
-                deal_data['price'],
-                deal_data['currency'],
-                deal_data.get('discount_percent'),
-                deal_data.get('deal_quality', 'good'),
-                str(deal_data.get('outbound')),
-                str(deal_data.get('inbound')),
-                deal_data.get('booking_link'),
-                datetime.now(),
-                deal_data.get('notified', False)
-            ))
+            """, rows)
 
             conn.commit()
-            logger.info(f"Recorded deal: {route} - {deal_data['price']} {deal_data['currency']}")
+            for row in rows:
+                logger.info(f"Recorded deal: {row[0]} - {row[5]} {row[6]}")
+            return len(rows)
 
         except Exception as e:
-            logger.error(f"Error adding deal: {e}")
+            logger.error(f"Error adding deals: {e}")
             conn.rollback()
-        finally:
-            conn.close()
+            return 0
 
     def get_price_statistics(
         self,
@@ -192,56 +720,326 @@ class Database:
         days: int = 30
     ) -> Dict[str, float]:
         """Get price statistics for a route over the last N days"""
+        return self.get_price_statistics_windows(route, [days])[days]
+
+    def get_price_statistics_windows(
+        self,
+        route: str,
+        periods: Sequence[int]
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Get price statistics for a route over several trailing windows at once
+
+        All windows are computed in one pass over the longest one, reading
+        only the partitions it overlaps.
+
+        Args:
+            route: Route code (e.g. 'WAW-GRU')
+            periods: Window lengths in days
+
+        Returns:
+            Statistics (as from get_price_statistics) keyed by window length
+        """
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        cutoff_date = datetime.now() - timedelta(days=days)
+        periods = sorted(set(periods))
+        cursor.execute(*self._price_statistics_sql(route, periods, datetime.now()))
 
-        cursor.execute("""
+        row = cursor.fetchone()
+
+        statistics = {}
+        for i, days in enumerate(periods):
+            if row and row[f'num_checks_{i}'] > 0:
+                statistics[days] = {
+                    'min': row[f'min_price_{i}'],
+                    'max': row[f'max_price_{i}'],
+                    'avg': row[f'avg_price_{i}'],
+                    'count': row[f'num_checks_{i}'],
+                    'period_days': days
+                }
+            else:
+                statistics[days] = {
+                    'min': None,
+                    'max': None,
+                    'avg': None,
+                    'count': 0,
+                    'period_days': days
+                }
+
+        return statistics
+
+    def _price_statistics_sql(
+        self,
+        route: str,
+        periods: Sequence[int],
+        now: datetime
+    ) -> Tuple[str, Tuple]:
+        """Build get_price_statistics_windows' query (periods sorted, unique)"""
+        cutoffs = [now - timedelta(days=days) for days in periods]
+
+        columns = []
+        params: List[Any] = []
+        for i, cutoff in enumerate(cutoffs):
+            columns.append(f"""
+                MIN(CASE WHEN checked_at > ? THEN price END) as min_price_{i},
+                MAX(CASE WHEN checked_at > ? THEN price END) as max_price_{i},
+                AVG(CASE WHEN checked_at > ? THEN price END) as avg_price_{i},
+                COUNT(CASE WHEN checked_at > ? THEN 1 END) as num_checks_{i}""")
+            params.extend([cutoff] * 4)
+
+        return f"""
+            SELECT {','.join(columns)}
+            FROM {self._price_checks_source(since=min(cutoffs))}
+            WHERE route = ? AND checked_at > ?
+        """, (*params, route, min(cutoffs))
+
+    def route_version(self, route: str) -> int:
+        """
+        Get a counter that changes whenever price checks of a route are
+        written or removed (for invalidating cached statistics)
+        """
+        return self._route_versions.get(route, 0) + self._global_version
+
+    def _bump_route_versions(self, routes: Optional[Iterable[str]] = None):
+        """Invalidate cached statistics of some routes (or all, if None)"""
+        with self._connections_lock:
+            if routes is None:
+                self._global_version += 1
+                return
+
+            for route in routes:
+                self._route_versions[route] = self._route_versions.get(route, 0) + 1
+
+    def get_cheapest_date_pairs(
+        self,
+        route: str,
+        departure_start: datetime,
+        departure_end: datetime,
+        trip_length_min: int,
+        trip_length_max: int,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Get the historically cheapest departure/return date pairs for a route"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(*self._cheapest_date_pairs_sql(
+            route, departure_start, departure_end, trip_length_min, trip_length_max, limit
+        ))
+
+        rows = cursor.fetchall()
+
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _cheapest_date_pairs_sql(
+        route: str,
+        departure_start: datetime,
+        departure_end: datetime,
+        trip_length_min: int,
+        trip_length_max: int,
+        limit: int
+    ) -> Tuple[str, Tuple]:
+        """Build get_cheapest_date_pairs' query"""
+        return """
             SELECT
-                MIN(price) as min_price,
-                MAX(price) as max_price,
+                departure_date,
+                return_date,
+                trip_length,
+                MIN(price) as min_price
+            FROM price_checks
+            WHERE route = ?
+              AND departure_date BETWEEN ? AND ?
+              AND trip_length BETWEEN ? AND ?
+            GROUP BY departure_date, return_date
+            ORDER BY min_price, departure_date, return_date
+            LIMIT ?
+        """, (
+            route,
+            departure_start.strftime('%Y-%m-%d'),
+            departure_end.strftime('%Y-%m-%d'),
+            trip_length_min,
+            trip_length_max,
+            limit
+        )
+
+    def get_date_pair_history(
+        self,
+        route: str,
+        departure_start: datetime,
+        departure_end: datetime
+    ) -> List[Dict[str, Any]]:
+        """Get price history per (departure date, trip length) for a route"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(*self._date_pair_history_sql(route, departure_start, departure_end))
+
+        rows = cursor.fetchall()
+
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _date_pair_history_sql(
+        route: str,
+        departure_start: datetime,
+        departure_end: datetime
+    ) -> Tuple[str, Tuple]:
+        """Build get_date_pair_history's query"""
+        return """
+            SELECT
+                departure_date,
+                trip_length,
+                COUNT(*) as num_checks,
                 AVG(price) as avg_price,
-                COUNT(*) as num_checks
+                MIN(price) as min_price,
+                AVG(price * price) as avg_sq_price
             FROM price_checks
-            WHERE route = ? AND checked_at > ?
-        """, (route, cutoff_date))
+            WHERE route = ?
+              AND departure_date BETWEEN ? AND ?
+            GROUP BY departure_date, trip_length
+        """, (
+            route,
+            departure_start.strftime('%Y-%m-%d'),
+            departure_end.strftime('%Y-%m-%d')
+        )
 
-        row = cursor.fetchone()
-        conn.close()
-
-        if row and row['num_checks'] > 0:
-            return {
-                'min': row['min_price'],
-                'max': row['max_price'],
-                'avg': row['avg_price'],
-                'count': row['num_checks'],
-                'period_days': days
-            }
+    def get_combination_observations(
+        self,
+        route: str,
+        since_departure: datetime
+    ) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """
+        Get last-observed time and price spread per (departure, return) date pair
+
+        Only pairs departing on or after since_departure are returned.
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(*self._combination_observations_sql(route, since_departure))
+
+        rows = cursor.fetchall()
 
         return {
-            'min': None,
-            'max': None,
-            'avg': None,
-            'count': 0,
-            'period_days': days
+            (row['departure_date'], row['return_date']): dict(row)
+            for row in rows
         }
 
+    @staticmethod
+    def _combination_observations_sql(route: str, since_departure: datetime) -> Tuple[str, Tuple]:
+        """Build get_combination_observations' query"""
+        return """
+            SELECT
+                departure_date,
+                return_date,
+                MAX(checked_at) as last_checked_at,
+                COUNT(*) as num_checks,
+                AVG(price) as avg_price,
+                AVG(price * price) as avg_sq_price
+            FROM price_checks
+            WHERE route = ? AND departure_date >= ?
+            GROUP BY departure_date, return_date
+        """, (route, since_departure.strftime('%Y-%m-%d'))
+
+    def add_api_usage(self, calls: int, used_at: datetime):
+        """Record API calls made by a run"""
+        conn = self._get_connection()
+
+        try:
+            conn.execute(
+                "INSERT INTO api_usage (used_at, calls) VALUES (?, ?)",
+                (used_at, calls)
+            )
+            conn.commit()
+        except Exception as e:
+            logger.error(f"Error recording API usage: {e}")
+            conn.rollback()
+
+    def get_api_usage(self, since: datetime) -> int:
+        """Get the number of API calls made since a point in time"""
+        conn = self._get_connection()
+        cursor = conn.cursor()
+
+        cursor.execute(*self._api_usage_sql(since))
+
+        row = cursor.fetchone()
+
+        return row['calls']
+
+    @staticmethod
+    def _api_usage_sql(since: datetime) -> Tuple[str, Tuple]:
+        """Build get_api_usage's query"""
+        return """
+            SELECT COALESCE(SUM(calls), 0) as calls
+            FROM api_usage
+            WHERE used_at >= ?
+        """, (since,)
+
     def get_recent_deals(self, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent deals found"""
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("""
+        cursor.execute(*self._recent_deals_sql(limit))
+
+        rows = cursor.fetchall()
+
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def _recent_deals_sql(limit: int) -> Tuple[str, Tuple]:
+        """Build get_recent_deals' query"""
+        return """
             SELECT * FROM deals
             ORDER BY found_at DESC
             LIMIT ?
-        """, (limit,))
+        """, (limit,)
 
-        rows = cursor.fetchall()
-        conn.close()
+    def get_price_sketch(self, route: str, days: int = 90) -> KLLSketch:
+        """
+        Get a quantile sketch of a route's prices over the last N days
 
-        return [dict(row) for row in rows]
+        Combines the daily sketches of aggregated days with the detailed
+        price checks that haven't been aggregated yet. The result is cached
+        and new price checks are merged into it as they are written, so it
+        is only rebuilt once a day (as the window moves) or after
+        maintenance.
+        """
+        cutoff_date = datetime.now() - timedelta(days=days)
+        key = (route, days)
+        cached = self._price_sketches.get(key)
+
+        if cached is not None and cached[:2] == (cutoff_date.strftime('%Y-%m-%d'), self._global_version):
+            with self._sketch_lock:
+                return KLLSketch.from_bytes(cached[2].to_bytes())
+
+        with self._sketch_lock:
+            sketch = self._build_price_sketch(route, cutoff_date)
+            self._price_sketches[key] = (cutoff_date.strftime('%Y-%m-%d'), self._global_version, sketch)
+            return KLLSketch.from_bytes(sketch.to_bytes())
+
+    def _build_price_sketch(self, route: str, cutoff_date: datetime) -> KLLSketch:
+        """Build a route's price sketch from daily_stats and recent price checks"""
+        conn = self._get_connection()
+        sketch = KLLSketch()
+
+        rows = conn.execute("""
+            SELECT sketch FROM daily_stats
+            WHERE route = ? AND date >= ? AND sketch IS NOT NULL
+        """, (route, cutoff_date.strftime('%Y-%m-%d'))).fetchall()
+
+        for row in rows:
+            sketch.merge(KLLSketch.from_bytes(row['sketch']))
+
+        prices = conn.execute(f"""
+            SELECT price FROM {self._price_checks_source(since=cutoff_date)}
+            WHERE route = ? AND checked_at > ?
+        """, (route, cutoff_date))
+
+        sketch.extend(row['price'] for row in prices)
+        return sketch
 
     def cleanup_old_data(
         self,
@@ -255,66 +1053,427 @@ class Database:
             detailed_days: Keep detailed checks for this many days
             aggregate_days: Keep daily aggregates for this many days
         """
+        self.run_maintenance(detailed_days=detailed_days, aggregate_days=aggregate_days)
+
+    def run_maintenance(
+        self,
+        detailed_days: int = 30,
+        aggregate_days: int = 365,
+        max_vacuum_pages: int = 2000
+    ) -> Dict[str, int]:
+        """
+        Roll up newly expired data and reclaim a bounded amount of space
+
+        Only price checks and daily stats that expired since the last run
+        are aggregated (tracked by watermarks in maintenance_state), whole
+        months of price checks are expired by dropping their partition, and
+        free pages are released with incremental_vacuum instead of a full
+        VACUUM, so the cost doesn't grow with the size of the database.
+
+        Args:
+            detailed_days: Keep detailed checks for this many days
+            aggregate_days: Keep daily aggregates (and API usage records)
+                for this many days
+            max_vacuum_pages: Most free pages to release per run
+
+        Returns:
+            Counts of rolled-up and deleted rows, dropped partitions and
+            vacuumed pages
+        """
         conn = self._get_connection()
-        cursor = conn.cursor()
+        summary = {
+            'deleted_checks': 0,
+            'dropped_partitions': 0,
+            'deleted_blobs': 0,
+            'deleted_days': 0,
+            'deleted_api_usage': 0,
+            'vacuumed_pages': 0
+        }
 
         try:
-            # Aggregate old detailed data into daily stats
+            # Aggregate newly expired detailed data into daily stats
             cutoff_detailed = datetime.now() - timedelta(days=detailed_days)
+            checks_watermark = self._get_maintenance_state('checks_rolled_up_until')
+            since = datetime.fromisoformat(checks_watermark) if checks_watermark else None
 
-            cursor.execute("""
-                INSERT OR REPLACE INTO daily_stats
-                SELECT
-                    DATE(checked_at) as date,
-                    route,
-                    MIN(price) as min_price,
-                    MAX(price) as max_price,
-                    AVG(price) as avg_price,
-                    AVG(price) as median_price,
-                    COUNT(*) as num_checks
-                FROM price_checks
-                WHERE checked_at < ?
-                GROUP BY DATE(checked_at), route
-            """, (cutoff_detailed,))
-
-            # Delete old detailed records
-            cursor.execute("""
-                DELETE FROM price_checks
-                WHERE checked_at < ?
-            """, (cutoff_detailed,))
-
-            deleted_count = cursor.rowcount
-
-            # Create monthly aggregates from old daily stats
-            cutoff_aggregate = datetime.now() - timedelta(days=aggregate_days)
-
-            cursor.execute("""
-                INSERT OR REPLACE INTO monthly_stats
-                SELECT
-                    strftime('%Y-%m', date) as month,
-                    route,
-                    MIN(min_price) as min_price,
-                    AVG(avg_price) as avg_price,
-                    COUNT(*) as num_days
-                FROM daily_stats
-                WHERE date < ?
-                GROUP BY strftime('%Y-%m', date), route
-            """, (cutoff_aggregate,))
+            if since is None or since < cutoff_detailed:
+                # Every check rolled up is expired below, so this is also
+                # the number removed (without counting dropped partitions)
+                summary['deleted_checks'] = self._rollup_daily_stats(cutoff_detailed, since=since)
+                summary['dropped_partitions'] = self._expire_price_checks(cutoff_detailed)
 
-            # Delete old daily stats
-            cursor.execute("""
-                DELETE FROM daily_stats
-                WHERE date < ?
-            """, (cutoff_aggregate,))
+                if summary['deleted_checks']:
+                    # Drop offer payloads no remaining price check refers to
+                    cursor = conn.execute("""
+                        DELETE FROM offer_blobs
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM price_checks WHERE price_checks.offer_hash = offer_blobs.hash
+                        )
+                    """)
+                    summary['deleted_blobs'] = cursor.rowcount
 
-            conn.commit()
+                self._set_maintenance_state('checks_rolled_up_until', cutoff_detailed.isoformat(sep=' '))
+
+            # Aggregate newly expired daily stats into monthly stats
+            cutoff_aggregate = (datetime.now() - timedelta(days=aggregate_days)).strftime('%Y-%m-%d')
+            days_watermark = self._get_maintenance_state('days_rolled_up_until')
+
+            if days_watermark is None or days_watermark < cutoff_aggregate:
+                self._rollup_monthly_stats(cutoff_aggregate, since=days_watermark)
 
-            # Vacuum to reclaim space (must be outside transaction)
-            cursor.execute("VACUUM")
-            logger.info(f"Cleanup complete: Removed {deleted_count} old price checks")
+                cursor = conn.execute("""
+                    DELETE FROM daily_stats
+                    WHERE date < ?
+                """, (cutoff_aggregate,))
+                summary['deleted_days'] = cursor.rowcount
+
+                self._set_maintenance_state('days_rolled_up_until', cutoff_aggregate)
+
+            # The budget planner only reads the current month's usage
+            usage_cutoff = datetime.now() - timedelta(days=max(aggregate_days, 31))
+            cursor = conn.execute("DELETE FROM api_usage WHERE used_at < ?", (usage_cutoff,))
+            summary['deleted_api_usage'] = cursor.rowcount
+
+            conn.commit()
+            self._bump_route_versions()
 
         except Exception as e:
-            logger.error(f"Error during cleanup: {e}")
+            logger.error(f"Error during maintenance: {e}")
             conn.rollback()
-        finally:
-            conn.close()
\ No newline at end of file
+            return summary
+
+        summary['vacuumed_pages'] = self._incremental_vacuum(max_vacuum_pages)
+        logger.info(
+            f"Maintenance complete: Removed {summary['deleted_checks']} old price checks "
+            f"({summary['dropped_partitions']} monthly partitions, {summary['deleted_blobs']} offer payloads), "
+            f"{summary['deleted_days']} old daily stats and {summary['deleted_api_usage']} API usage records, "
+            f"released {summary['vacuumed_pages']} pages"
+        )
+
+        return summary
+
+    def _expire_price_checks(self, cutoff: datetime) -> int:
+        """
+        Remove price checks made before cutoff
+
+        Partitions that end before the cutoff are dropped outright; only
+        the partition the cutoff falls into is trimmed row by row.
+
+        Returns:
+            Number of partitions dropped
+        """
+        conn = self._get_connection()
+        cutoff_partition = _partition_name(cutoff)
+        expired = [
+            partition for partition in _list_price_check_partitions(conn)
+            if partition < cutoff_partition
+        ]
+
+        for partition in expired:
+            conn.execute(f"DROP TABLE {partition}")
+            self._partitions.discard(partition)
+
+        if cutoff_partition in _list_price_check_partitions(conn):
+            conn.execute(f"DELETE FROM {cutoff_partition} WHERE checked_at < ?", (cutoff,))
+
+        if expired:
+            _rebuild_price_checks_view(conn)
+            logger.info(f"Dropped price check partitions: {', '.join(expired)}")
+
+        return len(expired)
+
+    def _get_maintenance_state(self, key: str) -> Optional[str]:
+        conn = self._get_connection()
+        row = conn.execute("SELECT value FROM maintenance_state WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_maintenance_state(self, key: str, value: str):
+        conn = self._get_connection()
+        conn.execute("INSERT OR REPLACE INTO maintenance_state (key, value) VALUES (?, ?)", (key, value))
+
+    def _incremental_vacuum(self, max_pages: int) -> int:
+        """
+        Release up to max_pages free pages back to the filesystem
+
+        Returns:
+            Number of pages released
+        """
+        conn = self._get_connection()
+
+        try:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                # One-off: databases created before incremental auto-vacuum
+                # need a full VACUUM to switch modes
+                logger.info("Converting database to incremental auto-vacuum (one-time full VACUUM)...")
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+                return 0
+
+            pages = min(conn.execute("PRAGMA freelist_count").fetchone()[0], max_pages)
+            if pages:
+                # executescript steps the pragma to completion; execute()
+                # would only release a single page
+                conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+            return pages
+
+        except Exception as e:
+            logger.error(f"Error during incremental vacuum: {e}")
+            return 0
+
+    def _rollup_daily_stats(self, cutoff: datetime, since: Optional[datetime] = None) -> int:
+        """
+        Fold price checks checked between since and cutoff into daily_stats
+
+        A day already in daily_stats (e.g. split across two runs) is merged
+        with the new checks rather than overwritten.
+
+        Returns:
+            Number of price checks rolled up
+        """
+        conn = self._get_connection()
+        days: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        num_rows = 0
+
+        rows = conn.execute(*self._rollup_checks_sql(cutoff, since))
+
+        for row in rows:
+            num_rows += 1
+            day = days.setdefault((row['date'], row['route']), {'sketch': KLLSketch(), 'total': 0.0})
+            day['sketch'].update(row['price'])
+            day['total'] += row['price']
+
+        for (date, route), day in days.items():
+            sketch = day['sketch']
+            total = day['total']
+
+            existing = conn.execute("""
+                SELECT min_price, max_price, avg_price, num_checks, sketch
+                FROM daily_stats
+                WHERE date = ? AND route = ?
+            """, (date, route)).fetchone()
+
+            min_price, max_price, num_checks = sketch.min, sketch.max, sketch.count
+            if existing:
+                if existing['sketch'] is not None:
+                    sketch.merge(KLLSketch.from_bytes(existing['sketch']))
+                min_price = min(min_price, existing['min_price'])
+                max_price = max(max_price, existing['max_price'])
+                total += existing['avg_price'] * existing['num_checks']
+                num_checks += existing['num_checks']
+
+            conn.execute("""
+                INSERT OR REPLACE INTO daily_stats (
+                    date, route, min_price, max_price, avg_price,
+                    median_price, p10_price, p25_price, num_checks, sketch
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                date,
+                route,
+                min_price,
+                max_price,
+                total / num_checks,
+                sketch.quantile(0.5),
+                sketch.quantile(0.1),
+                sketch.quantile(0.25),
+                num_checks,
+                sketch.to_bytes()
+            ))
+
+        return num_rows
+
+    def _rollup_checks_sql(self, cutoff: datetime, since: Optional[datetime] = None) -> Tuple[str, Tuple]:
+        """Build _rollup_daily_stats' query over the partitions in range"""
+        return f"""
+            SELECT DATE(checked_at) as date, route, price
+            FROM {self._price_checks_source(since=since, until=cutoff)}
+            WHERE checked_at >= ? AND checked_at < ?
+        """, (since or datetime.min, cutoff)
+
+    def _rollup_monthly_stats(self, cutoff_date: str, since: Optional[str] = None):
+        """
+        Fold daily stats dated between since and cutoff_date into
+        monthly_stats, merging with any existing row for the month
+        """
+        conn = self._get_connection()
+        months: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+        rows = conn.execute("""
+            SELECT strftime('%Y-%m', date) as month, route, min_price, avg_price, sketch
+            FROM daily_stats
+            WHERE date >= ? AND date < ?
+        """, (since or '', cutoff_date))
+
+        for row in rows:
+            month = months.setdefault(
+                (row['month'], row['route']),
+                {'sketch': KLLSketch(), 'min': row['min_price'], 'avg_total': 0.0, 'num_days': 0}
+            )
+            if row['sketch'] is not None:
+                month['sketch'].merge(KLLSketch.from_bytes(row['sketch']))
+            month['min'] = min(month['min'], row['min_price'])
+            month['avg_total'] += row['avg_price']
+            month['num_days'] += 1
+
+        for (month_key, route), month in months.items():
+            sketch = month['sketch']
+            min_price = month['min']
+            avg_total = month['avg_total']
+            num_days = month['num_days']
+
+            existing = conn.execute("""
+                SELECT min_price, avg_price, num_days, sketch
+                FROM monthly_stats
+                WHERE month = ? AND route = ?
+            """, (month_key, route)).fetchone()
+
+            if existing:
+                if existing['sketch'] is not None:
+                    sketch.merge(KLLSketch.from_bytes(existing['sketch']))
+                min_price = min(min_price, existing['min_price'])
+                avg_total += existing['avg_price'] * existing['num_days']
+                num_days += existing['num_days']
+
+            conn.execute("""
+                INSERT OR REPLACE INTO monthly_stats (
+                    month, route, min_price, avg_price,
+                    median_price, p10_price, p25_price, num_days, sketch
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                month_key,
+                route,
+                min_price,
+                avg_total / num_days,
+                sketch.quantile(0.5),
+                sketch.quantile(0.1),
+                sketch.quantile(0.25),
+                num_days,
+                sketch.to_bytes() if sketch.count else None
+            ))
+
+
+class DatabaseWriter:
+    """
+    Write-behind writer for price checks and deals
+
+    Callers enqueue rows and return immediately; a background thread
+    writes them with the Database's bulk methods. Whatever has queued up
+    while one transaction commits goes into the next (group commit), so
+    searching and analysis overlap with disk I/O. The queue is bounded:
+    when the disk can't keep up, enqueueing blocks instead of buffering
+    without limit.
+
+    Rows become visible (and route versions change) only once written,
+    so call flush() before reading back what was just enqueued.
+    """
+
+    _STOP = object()
+
+    def __init__(self, database: Database, queue_size: int = 10000, batch_size: int = 1000):
+        """
+        Args:
+            database: Database to write to
+            queue_size: Most rows waiting to be written before callers block
+            batch_size: Most rows committed in one transaction
+        """
+        self.db = database
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        self.dropped = 0  # Rows that could not be written
+        self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+        self._thread.start()
+
+    def add_price_check(self, flight_data: Dict[str, Any]):
+        """Queue a price check (see Database.add_price_check)"""
+        self._put('price_check', flight_data)
+
+    def add_price_checks(self, flight_data: Iterable[Dict[str, Any]]) -> int:
+        """
+        Queue many price checks (see Database.add_price_checks)
+
+        Returns:
+            Number of rows queued
+        """
+        count = 0
+        for data in flight_data:
+            self._put('price_check', data)
+            count += 1
+        return count
+
+    def add_deal(self, deal_data: Dict[str, Any]):
+        """Queue a deal (see Database.add_deal)"""
+        self._put('deal', deal_data)
+
+    def _put(self, kind: str, data: Dict[str, Any]):
+        if self._closed:
+            raise RuntimeError("DatabaseWriter is closed")
+        self._queue.put((kind, data))  # Blocks while the queue is full
+
+    def flush(self):
+        """Wait until everything queued so far has been written"""
+        self._queue.join()
+
+    def close(self):
+        """Write everything still queued and stop the writer thread"""
+        if self._closed:
+            return
+
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+
+        if self.dropped:
+            logger.warning(f"Database writer dropped {self.dropped} unwritable rows")
+
+    def _run(self):
+        """Writer thread: commit queued rows in groups until stopped"""
+        while True:
+            items = [self._queue.get()]
+
+            # Take whatever else is already waiting, up to one batch
+            while len(items) < self.batch_size and items[-1] is not self._STOP:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._write([item for item in items if item is not self._STOP])
+            except Exception as e:
+                logger.error(f"Error in background database writer: {e}")
+            finally:
+                for _ in items:
+                    self._queue.task_done()
+
+            if items[-1] is self._STOP:
+                return
+
+    def _write(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """Write one group of queued rows"""
+        price_checks = [data for kind, data in items if kind == 'price_check']
+        deals = [data for kind, data in items if kind == 'deal']
+
+        if price_checks:
+            self._write_rows(self.db.add_price_checks, price_checks, 'price check')
+        if deals:
+            self._write_rows(self.db.add_deals, deals, 'deal')
+
+    def _write_rows(self, write: Callable[[List[Dict[str, Any]]], int], rows: List[Dict[str, Any]], kind: str):
+        """
+        Write rows in one transaction, splitting the group when it fails
+
+        The bulk methods roll back and return 0 when any row is bad, so a
+        failed group is halved and retried until only the bad rows are
+        left; those are dropped and counted instead of the whole group.
+        """
+        if write(rows):
+            return
+
+        if len(rows) == 1:
+            self.dropped += 1
+            logger.warning(f"Dropped unwritable {kind} ({self.dropped} dropped so far): {rows[0]!r}")
+            return
+
+        middle = len(rows) // 2
+        self._write_rows(write, rows[:middle], kind)
+        self._write_rows(write, rows[middle:], kind)
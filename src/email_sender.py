@@ -3,12 +3,15 @@ Email sender for flight deal notifications
 """
 
 import logging
+import math
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from src.config import Config
+from src.models import FlightOffer
+from src.price_calendar import PriceCalendar
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +25,17 @@ class EmailSender:
         self.password = config.gmail_password
         self.recipient = config.email_recipient
     
-    def send_deal_alert(self, offers: List[Dict[str, Any]]):
+    def send_deal_alert(
+        self,
+        offers: List[FlightOffer],
+        calendar: Optional[PriceCalendar] = None
+    ):
         """
         Send email alert for flight deals
         
         Args:
             offers: List of analyzed flight offers
+            calendar: Optional price calendar to include as a fare grid
         """
         if not offers:
             logger.info("No offers to send")
@@ -35,23 +43,23 @@ class EmailSender:
         
         # Get best offer for subject line
         best_offer = offers[0]
-        analysis = best_offer['analysis']
+        analysis = best_offer.analysis
         
         # Create subject line
         subject = self._create_subject(best_offer, analysis)
         
         # Create email body
-        html_body = self._create_html_body(offers)
-        text_body = self._create_text_body(offers)
+        html_body = self._create_html_body(offers, calendar)
+        text_body = self._create_text_body(offers, calendar)
         
         # Send email
         self._send_email(subject, html_body, text_body)
     
-    def _create_subject(self, offer: Dict[str, Any], analysis: Dict[str, Any]) -> str:
+    def _create_subject(self, offer: FlightOffer, analysis: Dict[str, Any]) -> str:
         """Create email subject line"""
         quality = analysis['deal_quality']
-        price = offer['price']
-        currency = offer['currency']
+        price = offer.price
+        currency = offer.currency
         discount = analysis.get('discount_percent', 0)
         
         emoji = {
@@ -63,14 +71,18 @@ class EmailSender:
         
         quality_text = quality.upper() + " DEAL" if quality != 'average' else "Flight Update"
         
-        route_text = f"{offer['origin']} → {offer['destination']}"
+        route_text = f"{offer.origin} → {offer.destination}"
         
         if discount and discount > 0:
             return f"{emoji} {quality_text}: {route_text} for {price:,.0f} {currency} ({discount:.0f}% off!)"
         else:
             return f"{emoji} {quality_text}: {route_text} for {price:,.0f} {currency}"
     
-    def _create_html_body(self, offers: List[Dict[str, Any]]) -> str:
+    def _create_html_body(
+        self,
+        offers: List[FlightOffer],
+        calendar: Optional[PriceCalendar] = None
+    ) -> str:
         """Create HTML email body"""
         html = """
         <html>
@@ -103,15 +115,15 @@ class EmailSender:
         """
         
         for i, offer in enumerate(offers):
-            analysis = offer['analysis']
+            analysis = offer.analysis
             quality = analysis['deal_quality']
             
             html += f"""
                 <div class="deal {quality}">
-                    <h2>{i+1}. {offer['origin']} → {offer['destination']}</h2>
+                    <h2>{i+1}. {offer.origin} → {offer.destination}</h2>
                     
                     <div class="price">
-                        {offer['price']:,.0f} {offer['currency']}
+                        {offer.price:,.0f} {offer.currency}
             """
             
             if analysis.get('discount_percent') and analysis['discount_percent'] > 0:
@@ -124,20 +136,20 @@ class EmailSender:
             """
             
             # Trip details
-            outbound = offer.get('outbound', {})
-            inbound = offer.get('inbound', {})
+            outbound = offer.outbound
+            inbound = offer.inbound
             
             if outbound:
                 html += f"""
                     <div class="flight-details">
                         <strong>✈️ OUTBOUND:</strong><br>
-                        {outbound.get('departure_time', '')[:10]}: 
-                        {outbound.get('departure_airport')} → {outbound.get('arrival_airport')}
-                        ({outbound.get('stops', 0)} stop{'s' if outbound.get('stops', 0) != 1 else ''})
+                        {(outbound.departure_time or '')[:10]}: 
+                        {outbound.departure_airport} → {outbound.arrival_airport}
+                        ({outbound.stops} stop{'s' if outbound.stops != 1 else ''})
                 """
                 
-                if outbound.get('connections'):
-                    html += f"<br>via {', '.join(outbound['connections'])}"
+                if outbound.connections:
+                    html += f"<br>via {', '.join(outbound.connections)}"
                 
                 html += """
                     </div>
@@ -147,13 +159,13 @@ class EmailSender:
                 html += f"""
                     <div class="flight-details">
                         <strong>✈️ RETURN:</strong><br>
-                        {inbound.get('departure_time', '')[:10]}: 
-                        {inbound.get('departure_airport')} → {inbound.get('arrival_airport')}
-                        ({inbound.get('stops', 0)} stop{'s' if inbound.get('stops', 0) != 1 else ''})
+                        {(inbound.departure_time or '')[:10]}: 
+                        {inbound.departure_airport} → {inbound.arrival_airport}
+                        ({inbound.stops} stop{'s' if inbound.stops != 1 else ''})
                 """
                 
-                if inbound.get('connections'):
-                    html += f"<br>via {', '.join(inbound['connections'])}"
+                if inbound.connections:
+                    html += f"<br>via {', '.join(inbound.connections)}"
                 
                 html += """
                     </div>
@@ -165,19 +177,29 @@ class EmailSender:
                 html += f"""
                     <div class="stats">
                         <strong>📊 Price Analysis:</strong><br>
-                        30-day average: {stats_30d['avg']:,.0f} {offer['currency']}<br>
-                        30-day low: {stats_30d.get('min', 'N/A'):,.0f} {offer['currency']}<br>
+                        30-day average: {stats_30d['avg']:,.0f} {offer.currency}<br>
+                        30-day low: {stats_30d.get('min', 'N/A'):,.0f} {offer.currency}<br>
                         Checks in last 30 days: {stats_30d.get('count', 0)}
+                """
+                
+                percentile = analysis.get('comparison', {}).get('percentile')
+                if percentile is not None:
+                    html += f"<br>Cheaper than {100 - percentile:.0f}% of fares seen in 90 days"
+                
+                html += """
                     </div>
                 """
             
             # Booking link
-            booking_link = offer.get('booking_link', 'https://www.google.com/flights')
+            booking_link = offer.booking_link or 'https://www.google.com/flights'
             html += f"""
                     <a href="{booking_link}" class="button">🔗 Book Now</a>
                 </div>
             """
         
+        if calendar is not None and not calendar.is_empty:
+            html += self._create_calendar_html(calendar)
+        
         html += f"""
                 <div class="footer">
                     <p>This alert was sent because the deal meets your criteria:</p>
@@ -195,17 +217,21 @@ class EmailSender:
         
         return html
     
-    def _create_text_body(self, offers: List[Dict[str, Any]]) -> str:
+    def _create_text_body(
+        self,
+        offers: List[FlightOffer],
+        calendar: Optional[PriceCalendar] = None
+    ) -> str:
         """Create plain text email body"""
         text = "✈️ FLIGHT DEAL ALERT - Warsaw → Brazil\n"
         text += "=" * 60 + "\n\n"
         
         for i, offer in enumerate(offers):
-            analysis = offer['analysis']
+            analysis = offer.analysis
             quality = analysis['deal_quality'].upper()
             
-            text += f"{i+1}. {quality} DEAL: {offer['origin']} → {offer['destination']}\n"
-            text += f"Price: {offer['price']:,.0f} {offer['currency']}"
+            text += f"{i+1}. {quality} DEAL: {offer.origin} → {offer.destination}\n"
+            text += f"Price: {offer.price:,.0f} {offer.currency}"
             
             if analysis.get('discount_percent') and analysis['discount_percent'] > 0:
                 text += f" ({analysis['discount_percent']:.0f}% below average!)"
@@ -213,41 +239,105 @@ class EmailSender:
             text += "\n\n"
             
             # Flight details
-            outbound = offer.get('outbound', {})
-            inbound = offer.get('inbound', {})
+            outbound = offer.outbound
+            inbound = offer.inbound
             
             if outbound:
-                text += f"✈️ OUTBOUND: {outbound.get('departure_time', '')[:10]}\n"
-                text += f"   {outbound.get('departure_airport')} → {outbound.get('arrival_airport')}\n"
-                text += f"   {outbound.get('stops', 0)} stop(s)"
-                if outbound.get('connections'):
-                    text += f" via {', '.join(outbound['connections'])}"
+                text += f"✈️ OUTBOUND: {(outbound.departure_time or '')[:10]}\n"
+                text += f"   {outbound.departure_airport} → {outbound.arrival_airport}\n"
+                text += f"   {outbound.stops} stop(s)"
+                if outbound.connections:
+                    text += f" via {', '.join(outbound.connections)}"
                 text += "\n\n"
             
             if inbound:
-                text += f"✈️ RETURN: {inbound.get('departure_time', '')[:10]}\n"
-                text += f"   {inbound.get('departure_airport')} → {inbound.get('arrival_airport')}\n"
-                text += f"   {inbound.get('stops', 0)} stop(s)"
-                if inbound.get('connections'):
-                    text += f" via {', '.join(inbound['connections'])}"
+                text += f"✈️ RETURN: {(inbound.departure_time or '')[:10]}\n"
+                text += f"   {inbound.departure_airport} → {inbound.arrival_airport}\n"
+                text += f"   {inbound.stops} stop(s)"
+                if inbound.connections:
+                    text += f" via {', '.join(inbound.connections)}"
                 text += "\n\n"
             
             # Statistics
             stats_30d = analysis.get('stats_30d', {})
             if stats_30d.get('avg'):
                 text += f"📊 Price Analysis:\n"
-                text += f"   30-day average: {stats_30d['avg']:,.0f} {offer['currency']}\n"
-                text += f"   30-day low: {stats_30d.get('min', 'N/A'):,.0f} {offer['currency']}\n"
+                text += f"   30-day average: {stats_30d['avg']:,.0f} {offer.currency}\n"
+                text += f"   30-day low: {stats_30d.get('min', 'N/A'):,.0f} {offer.currency}\n"
                 text += f"   Recent checks: {stats_30d.get('count', 0)}\n"
+                
+                percentile = analysis.get('comparison', {}).get('percentile')
+                if percentile is not None:
+                    text += f"   Cheaper than {100 - percentile:.0f}% of fares seen in 90 days\n"
             
-            text += f"\n🔗 Book: {offer.get('booking_link', 'https://www.google.com/flights')}\n"
+            text += f"\n🔗 Book: {offer.booking_link or 'https://www.google.com/flights'}\n"
             text += "\n" + "-" * 60 + "\n\n"
         
+        if calendar is not None and not calendar.is_empty:
+            text += self._create_calendar_text(calendar)
+        
         text += f"\nGenerated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
         text += "Flight Deal Bot\n"
         
         return text
     
+    def _calendar_rows(self, calendar: PriceCalendar):
+        """Departure dates with at least one fare, with their cells and highlight mask"""
+        highlight = calendar.within_percent_of_best(
+            self.config.get('email.calendar_highlight_percent', 10)
+        )
+        
+        for i, departure_date in enumerate(calendar.departure_dates):
+            row = calendar.prices[i]
+            if all(math.isnan(price) for price in row):
+                continue
+            yield departure_date, row, highlight[i]
+    
+    def _create_calendar_html(self, calendar: PriceCalendar) -> str:
+        """Create HTML fare grid (departure date x trip length)"""
+        html = """
+                <div class="stats">
+                    <strong>📅 Fare Calendar</strong> (departure date × trip length, cheapest fares in bold)
+                    <table cellpadding="4" style="border-collapse: collapse; font-size: 13px;">
+                        <tr><th></th>
+        """
+        
+        for length in calendar.trip_lengths:
+            html += f"<th>{length}d</th>"
+        html += "</tr>"
+        
+        for departure_date, row, highlight in self._calendar_rows(calendar):
+            html += f"<tr><td>{departure_date.strftime('%a %d %b')}</td>"
+            for price, is_cheap in zip(row, highlight):
+                if math.isnan(price):
+                    html += "<td>–</td>"
+                elif is_cheap:
+                    html += f"<td><strong>{price:,.0f}</strong></td>"
+                else:
+                    html += f"<td>{price:,.0f}</td>"
+            html += "</tr>"
+        
+        html += """
+                    </table>
+                </div>
+        """
+        
+        return html
+    
+    def _create_calendar_text(self, calendar: PriceCalendar) -> str:
+        """Create plain text fare grid (departure date x trip length)"""
+        text = "📅 FARE CALENDAR (departure date x trip length, * = cheapest)\n"
+        text += " " * 12 + "".join(f"{length:>9}d" for length in calendar.trip_lengths) + "\n"
+        
+        for departure_date, row, highlight in self._calendar_rows(calendar):
+            text += f"{departure_date.strftime('%a %d %b'):<12}"
+            for price, is_cheap in zip(row, highlight):
+                cell = "-" if math.isnan(price) else f"{price:,.0f}{'*' if is_cheap else ''}"
+                text += f"{cell:>10}"
+            text += "\n"
+        
+        return text + "\n"
+    
     def _send_email(self, subject: str, html_body: str, text_body: str):
         """Send email via Gmail SMTP"""
         try:
@@ -0,0 +1,324 @@
+"""
+Parquet export - columnar, partitioned copies of the price history for analytics
+"""
+
+import logging
+import shutil
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for export/analytics
+    pa = None
+
+try:
+    import duckdb
+except ImportError:  # optional, enables SQL queries over the export
+    duckdb = None
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("Parquet export requires pyarrow. Install it with: pip install pyarrow")
+
+
+def _to_date(value: Optional[str]) -> Optional[date]:
+    return date.fromisoformat(value[:10]) if value else None
+
+
+def _to_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _to_text(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+# table -> (month expression, sort order, [(column, arrow type name, converter)])
+# Every table is partitioned as <table>/route=<route>/month=<YYYY-MM>/
+EXPORT_TABLES: Dict[str, Tuple[str, str, List[Tuple[str, str, Optional[Callable]]]]] = {
+    'price_checks': (
+        "strftime('%Y-%m', checked_at)",
+        "route, checked_at",
+        [
+            ('id', 'int64', None),
+            ('origin', 'string', None),
+            ('destination', 'string', None),
+            ('departure_date', 'date32', _to_date),
+            ('return_date', 'date32', _to_date),
+            ('trip_length', 'int32', None),
+            ('price', 'float64', float),
+            ('currency', 'string', None),
+            ('stops', 'int32', None),
+            ('airlines', 'string', None),
+            ('connections', 'string', None),
+            ('checked_at', 'timestamp', _to_timestamp),
+        ]
+    ),
+    'daily_stats': (
+        "strftime('%Y-%m', date)",
+        "route, date",
+        [
+            ('date', 'date32', _to_date),
+            ('min_price', 'float64', float),
+            ('max_price', 'float64', float),
+            ('avg_price', 'float64', float),
+            ('median_price', 'float64', float),
+            ('p10_price', 'float64', float),
+            ('p25_price', 'float64', float),
+            ('num_checks', 'int64', None),
+        ]
+    ),
+    'monthly_stats': (
+        "month",
+        "route, month",
+        [
+            ('min_price', 'float64', float),
+            ('avg_price', 'float64', float),
+            ('median_price', 'float64', float),
+            ('p10_price', 'float64', float),
+            ('p25_price', 'float64', float),
+            ('num_days', 'int64', None),
+        ]
+    ),
+    'deals': (
+        "strftime('%Y-%m', found_at)",
+        "route, found_at",
+        [
+            ('id', 'int64', None),
+            ('origin', 'string', None),
+            ('destination', 'string', None),
+            ('departure_date', 'date32', _to_date),
+            ('return_date', 'date32', _to_date),
+            ('price', 'float64', float),
+            ('currency', 'string', None),
+            ('discount_percent', 'float64', float),
+            ('deal_quality', 'string', None),
+            ('booking_link', 'string', _to_text),
+            ('found_at', 'timestamp', _to_timestamp),
+            ('notified', 'bool_', bool),
+        ]
+    ),
+}
+
+
+def _arrow_type(name: str) -> 'pa.DataType':
+    if name == 'timestamp':
+        return pa.timestamp('us')
+    return getattr(pa, name)()
+
+
+class ParquetExporter:
+    """
+    Streams the history tables into Hive-partitioned Parquet files
+
+    Rows are read in batches with fetchmany and written partition by
+    partition, so memory use is bounded by batch_size whatever the size
+    of the database. Each export replaces the previous one.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        output_dir: str = "data/export",
+        batch_size: int = 10000
+    ):
+        _require_pyarrow()
+
+        self.db = database
+        self.output_dir = Path(output_dir)
+        self.batch_size = batch_size
+
+    def export_all(self) -> Dict[str, int]:
+        """
+        Export every history table
+
+        Returns:
+            Rows exported per table
+        """
+        return {table: self.export_table(table) for table in EXPORT_TABLES}
+
+    def export_table(self, table: str) -> int:
+        """Export one table; returns the number of rows written"""
+        month_expression, order_by, columns = EXPORT_TABLES[table]
+        schema = pa.schema([(name, _arrow_type(type_name)) for name, type_name, _ in columns])
+
+        table_dir = self.output_dir / table
+        staging_dir = self.output_dir / f".{table}.tmp"
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+        writer = None
+        partition = None
+        total = 0
+
+        try:
+            for rows in self._read_batches(table, month_expression, order_by, columns):
+                # Rows arrive sorted by route and time, so each partition is
+                # one contiguous run
+                start = 0
+                for i in range(1, len(rows) + 1):
+                    if i < len(rows) and (rows[i]['route'], rows[i]['month']) == (rows[start]['route'], rows[start]['month']):
+                        continue
+
+                    key = (rows[start]['route'], rows[start]['month'])
+                    if key != partition:
+                        if writer is not None:
+                            writer.close()
+                        partition_dir = staging_dir / f"route={key[0]}" / f"month={key[1]}"
+                        partition_dir.mkdir(parents=True, exist_ok=True)
+                        writer = pq.ParquetWriter(partition_dir / "part-0.parquet", schema, compression='zstd')
+                        partition = key
+
+                    writer.write_batch(self._record_batch(rows[start:i], columns, schema))
+                    total += i - start
+                    start = i
+        finally:
+            if writer is not None:
+                writer.close()
+
+        # Swap in the new export only once it is complete
+        shutil.rmtree(table_dir, ignore_errors=True)
+        if staging_dir.exists():
+            staging_dir.rename(table_dir)
+        else:
+            table_dir.mkdir(parents=True)
+
+        logger.info(f"Exported {total} rows from {table} to {table_dir}")
+        return total
+
+    def _read_batches(
+        self,
+        table: str,
+        month_expression: str,
+        order_by: str,
+        columns: List[Tuple[str, str, Optional[Callable]]]
+    ) -> Iterator[List[Any]]:
+        """Yield a table's rows in batches, sorted by route and time"""
+        conn = self.db._get_connection()
+
+        # price_checks is stored as one table per month; reading them one at
+        # a time keeps each sort on that month's index. A (route, month) run
+        # never spans two of them.
+        sources = self.db.price_check_partitions() if table == 'price_checks' else [table]
+
+        for source in sources:
+            cursor = conn.execute(f"""
+                SELECT route, {month_expression} as month, {', '.join(name for name, _, _ in columns)}
+                FROM {source}
+                ORDER BY {order_by}
+            """)
+
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    @staticmethod
+    def _record_batch(
+        rows: Sequence[Any],
+        columns: List[Tuple[str, str, Optional[Callable]]],
+        schema: 'pa.Schema'
+    ) -> 'pa.RecordBatch':
+        """Convert sqlite rows into a columnar record batch"""
+        arrays = []
+        for (name, _, convert), field in zip(columns, schema):
+            values = [row[name] for row in rows]
+            if convert is not None:
+                values = [None if value is None else convert(value) for value in values]
+            arrays.append(pa.array(values, type=field.type))
+
+        return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class PriceHistory:
+    """
+    Query API over a Parquet export
+
+    Route and month filters prune whole partitions, so scanning months of
+    one route only touches that route's files.
+    """
+
+    def __init__(self, export_dir: str = "data/export"):
+        _require_pyarrow()
+        self.export_dir = Path(export_dir)
+
+    def dataset(self, table: str = 'price_checks') -> 'ds.Dataset':
+        """The partitioned Arrow dataset of an exported table"""
+        return ds.dataset(
+            self.export_dir / table,
+            format='parquet',
+            partitioning=ds.partitioning(
+                pa.schema([('route', pa.string()), ('month', pa.string())]),
+                flavor='hive'
+            )
+        )
+
+    def scan(
+        self,
+        route: str,
+        start_month: Optional[str] = None,
+        end_month: Optional[str] = None,
+        table: str = 'price_checks',
+        columns: Optional[List[str]] = None
+    ) -> 'pa.Table':
+        """
+        Read a route's rows between two months (inclusive, 'YYYY-MM')
+
+        Args:
+            route: Route code (e.g. 'WAW-GRU')
+            start_month: First month to include
+            end_month: Last month to include
+            table: Exported table to read
+            columns: Columns to read (default: all)
+
+        Returns:
+            Arrow table of the matching rows
+        """
+        condition = ds.field('route') == route
+        if start_month:
+            condition &= ds.field('month') >= start_month
+        if end_month:
+            condition &= ds.field('month') <= end_month
+
+        return self.dataset(table).to_table(columns=columns, filter=condition)
+
+    def monthly_summary(self, route: str) -> 'pa.Table':
+        """Min, mean and number of price checks per month for a route"""
+        prices = self.scan(route, columns=['month', 'price'])
+        return prices.group_by('month').aggregate([
+            ('price', 'min'),
+            ('price', 'mean'),
+            ('price', 'count')
+        ]).sort_by('month')
+
+    def query(self, sql: str) -> 'pa.Table':
+        """
+        Run SQL over the export with DuckDB
+
+        Each exported table is available as a view of the same name, with
+        route and month columns from the partitioning.
+        """
+        if duckdb is None:
+            raise ImportError("SQL queries require duckdb. Install it with: pip install duckdb")
+
+        conn = duckdb.connect()
+        try:
+            for table in EXPORT_TABLES:
+                table_dir = self.export_dir / table
+                if any(table_dir.glob('**/*.parquet')):
+                    conn.execute(
+                        f"CREATE VIEW {table} AS SELECT * FROM read_parquet("
+                        f"'{table_dir.as_posix()}/**/*.parquet', hive_partitioning = true)"
+                    )
+            return conn.execute(sql).fetch_arrow_table()
+        finally:
+            conn.close()
@@ -0,0 +1,367 @@
+"""
+Local fake Amadeus HTTP server for offline benchmarking and testing
+
+Serves recorded cassettes (flight-offers GET/POST and flight-dates) or
+synthetic responses for queries the cassette lacks, with configurable
+latency and error rates. Point FlightAPI at it with
+api.client_options: {host: localhost, port: 8088, ssl: false}
+
+Usage:
+    python -m src.fake_amadeus --port 8088 --latency-ms 150 --error-rate 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.replay import Cassette
+
+logger = logging.getLogger(__name__)
+
+SYNTHETIC_HUBS = ['FRA', 'AMS', 'MAD', 'LIS', 'IST', 'CDG']
+SYNTHETIC_AIRLINES = ['LH', 'KL', 'IB', 'TP', 'TK', 'AF']
+
+
+class FakeAmadeusServer:
+    """Threaded HTTP server imitating the Amadeus endpoints used by the bot"""
+
+    def __init__(
+        self,
+        host: str = 'localhost',
+        port: int = 8088,
+        cassette: Optional[Cassette] = None,
+        latency_ms: float = 0,
+        latency_jitter_ms: float = 0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        seed: int = 42
+    ):
+        self.cassette = cassette
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.seed = seed
+
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.requests_served = 0
+        self._served_lock = threading.Lock()  # Handler threads count concurrently
+
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._httpd.server_address[1]
+
+    def start(self):
+        """Serve requests in a background thread"""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            name='fake-amadeus',
+            daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Fake Amadeus server listening on port {self.port}")
+
+    def stop(self):
+        """Stop the server"""
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def serve_forever(self):
+        """Serve requests in the current thread"""
+        logger.info(f"Fake Amadeus server listening on port {self.port}")
+        self._httpd.serve_forever()
+
+    def _random(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                raw_body = self.rfile.read(length)
+                path = urlparse(self.path).path
+
+                if path == '/v2/shopping/flight-offers':
+                    status, body, headers = server._handle_post_offers(json.loads(raw_body or b'{}'))
+                    self._send_json(status, body, headers)
+                elif path == '/v1/security/oauth2/token':
+                    self._send_json(200, {
+                        'type': 'amadeusOAuth2Token',
+                        'access_token': 'fake-access-token',
+                        'token_type': 'Bearer',
+                        'expires_in': 1799,
+                        'state': 'approved'
+                    })
+                else:
+                    self._send_json(404, {'errors': [{'status': 404, 'title': 'NOT FOUND'}]})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(url.query).items()}
+                status, body, headers = server._handle_get(url.path, params)
+                self._send_json(status, body, headers)
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/vnd.amadeus+json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _simulate_conditions(self) -> Optional[Tuple[int, Dict[str, Any], Dict[str, str]]]:
+        """Apply latency and return an error response if one is due"""
+        with self._served_lock:
+            self.requests_served += 1
+
+        if self.latency_ms or self.latency_jitter_ms:
+            jitter = self._random() * self.latency_jitter_ms
+            time.sleep((self.latency_ms + jitter) / 1000)
+
+        if self.rate_limit_rate and self._random() < self.rate_limit_rate:
+            return 429, {'errors': [{'status': 429, 'title': 'Too many requests'}]}, {'Retry-After': '1'}
+
+        if self.error_rate and self._random() < self.error_rate:
+            return 500, {'errors': [{'status': 500, 'title': 'INTERNAL ERROR'}]}, {}
+
+        return None
+
+    def _handle_post_offers(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """Build the response for a POST flight-offers search"""
+        error = self._simulate_conditions()
+        if error:
+            return error
+
+        key = ('flight-offers-post', json.dumps(body, sort_keys=True))
+        recorded = self.cassette.get(key) if self.cassette else None
+        data = recorded if recorded is not None else self._synthetic_post(body)
+        return 200, {'meta': {'count': len(data)}, 'data': data}, {}
+
+    def _handle_get(
+        self,
+        path: str,
+        params: Dict[str, str]
+    ) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """Build the response for a GET request"""
+        error = self._simulate_conditions()
+        if error:
+            return error
+
+        if path == '/v2/shopping/flight-offers':
+            key = (
+                params.get('originLocationCode'),
+                params.get('destinationLocationCode'),
+                params.get('departureDate'),
+                params.get('returnDate'),
+                params.get('adults', '1'),
+                params.get('max', '10')
+            )
+            recorded = self.cassette.get(key) if self.cassette else None
+            data = recorded if recorded is not None else self._synthetic_offers(key)
+            return 200, {'meta': {'count': len(data)}, 'data': data}, {}
+
+        if path == '/v1/shopping/flight-dates':
+            start, _, end = params.get('departureDate', '').partition(',')
+            min_days, _, max_days = params.get('duration', '').partition(',')
+            key = (
+                'flight-dates',
+                params.get('origin'),
+                params.get('destination'),
+                start,
+                end or start,
+                min_days,
+                max_days or min_days
+            )
+            recorded = self.cassette.get(key) if self.cassette else None
+            data = recorded if recorded is not None else self._synthetic_dates(params)
+            return 200, {'data': data}, {}
+
+        return 404, {'errors': [{'status': 404, 'title': 'NOT FOUND'}]}, {}
+
+    def _query_rng(self, key: Tuple) -> random.Random:
+        """Deterministic RNG per query so repeated runs see the same prices"""
+        digest = hashlib.sha256(f"{self.seed}|{key}".encode('utf-8')).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _synthetic_offers(self, key: Tuple) -> List[Dict[str, Any]]:
+        """Generate plausible round-trip offers for a query"""
+        origin, destination, departure_date, return_date, _, max_results = key
+        rng = self._query_rng(key)
+
+        offers = []
+        for i in range(int(max_results or 10)):
+            stops_out = rng.randint(0, 2)
+            stops_in = rng.randint(0, 2)
+            price = rng.uniform(1800, 5500) + 250 * (2 - min(stops_out, stops_in))
+
+            offers.append({
+                'type': 'flight-offer',
+                'id': str(i + 1),
+                'itineraries': [
+                    self._synthetic_itinerary(rng, origin, destination, departure_date, stops_out),
+                    self._synthetic_itinerary(rng, destination, origin, return_date, stops_in)
+                ],
+                'price': {'currency': 'PLN', 'total': f"{price:.2f}"}
+            })
+
+        offers.sort(key=lambda offer: float(offer['price']['total']))
+        return offers
+
+    def _synthetic_post(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Generate offers for a POST search, varying dates and airports within its options"""
+        outbound, inbound = body['originDestinations'][:2]
+        max_results = body.get('searchCriteria', {}).get('maxFlightOffers', 10)
+        rng = self._query_rng(json.dumps(body, sort_keys=True))
+
+        def variants(leg: Dict[str, Any]) -> Tuple[List[str], List[str], List[datetime]]:
+            date_range = leg['departureDateTimeRange']
+            window = int(date_range.get('dateWindow', 'I0D')[1:-1] or 0)
+            centre = datetime.strptime(date_range['date'], '%Y-%m-%d')
+            return (
+                [leg['originLocationCode']] + leg.get('alternativeOriginsCodes', []),
+                [leg['destinationLocationCode']] + leg.get('alternativeDestinationsCodes', []),
+                [centre + timedelta(days=d) for d in range(-window, window + 1)]
+            )
+
+        origins, destinations, departure_dates = variants(outbound)
+        _, _, return_dates = variants(inbound)
+
+        offers = []
+        for i in range(int(max_results)):
+            origin = rng.choice(origins)
+            destination = rng.choice(destinations)
+            stops_out = rng.randint(0, 2)
+            stops_in = rng.randint(0, 2)
+            price = rng.uniform(1800, 5500) + 250 * (2 - min(stops_out, stops_in))
+
+            offers.append({
+                'type': 'flight-offer',
+                'id': str(i + 1),
+                'itineraries': [
+                    self._synthetic_itinerary(
+                        rng, origin, destination,
+                        rng.choice(departure_dates).strftime('%Y-%m-%d'), stops_out
+                    ),
+                    self._synthetic_itinerary(
+                        rng, destination, origin,
+                        rng.choice(return_dates).strftime('%Y-%m-%d'), stops_in
+                    )
+                ],
+                'price': {'currency': 'PLN', 'total': f"{price:.2f}"}
+            })
+
+        offers.sort(key=lambda offer: float(offer['price']['total']))
+        return offers
+
+    def _synthetic_itinerary(
+        self,
+        rng: random.Random,
+        origin: str,
+        destination: str,
+        date: str,
+        stops: int
+    ) -> Dict[str, Any]:
+        """Generate an itinerary with the given number of stops"""
+        airports = [origin] + rng.sample(SYNTHETIC_HUBS, stops) + [destination]
+        departure = datetime.strptime(date, '%Y-%m-%d') + timedelta(hours=rng.randint(6, 22))
+        total_hours = 0
+
+        segments = []
+        for i in range(len(airports) - 1):
+            hours = rng.randint(2, 12)
+            arrival = departure + timedelta(hours=hours)
+            segments.append({
+                'departure': {'iataCode': airports[i], 'at': departure.strftime('%Y-%m-%dT%H:%M:%S')},
+                'arrival': {'iataCode': airports[i + 1], 'at': arrival.strftime('%Y-%m-%dT%H:%M:%S')},
+                'carrierCode': rng.choice(SYNTHETIC_AIRLINES)
+            })
+            layover = rng.randint(1, 5)
+            total_hours += hours + layover
+            departure = arrival + timedelta(hours=layover)
+
+        return {'duration': f"PT{total_hours}H", 'segments': segments}
+
+    def _synthetic_dates(self, params: Dict[str, str]) -> List[Dict[str, Any]]:
+        """Generate cheapest-date results for a departure window"""
+        start, _, end = params.get('departureDate', '').partition(',')
+        min_days, _, max_days = params.get('duration', '7').partition(',')
+        start_date = datetime.strptime(start, '%Y-%m-%d')
+        end_date = datetime.strptime(end or start, '%Y-%m-%d')
+        rng = self._query_rng(tuple(sorted(params.items())))
+
+        dates = []
+        current = start_date
+        while current <= end_date:
+            length = rng.randint(int(min_days), int(max_days or min_days))
+            dates.append({
+                'type': 'flight-date',
+                'origin': params.get('origin'),
+                'destination': params.get('destination'),
+                'departureDate': current.strftime('%Y-%m-%d'),
+                'returnDate': (current + timedelta(days=length)).strftime('%Y-%m-%d'),
+                'price': {'total': f"{rng.uniform(1800, 5500):.2f}"}
+            })
+            current += timedelta(days=1)
+
+        return dates
+
+
+def main():
+    """Run the fake server from the command line"""
+    parser = argparse.ArgumentParser(description='Fake Amadeus API server for offline benchmarks')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--cassette', help='Serve recorded responses from this cassette file')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Fixed latency per request')
+    parser.add_argument('--latency-jitter-ms', type=float, default=0, help='Random extra latency per request')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = FakeAmadeusServer(
+        host=args.host,
+        port=args.port,
+        cassette=Cassette(args.cassette) if args.cassette else None,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Fake Amadeus server stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,24 +2,177 @@
 Amadeus API client for flight searches
 """
 
+import json
 import logging
+import random
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
+from collections import OrderedDict
+from typing import List, Dict, Optional, Any, Callable, Hashable, Iterator, Union
 from amadeus import Client, ResponseError
+from amadeus.client.access_token import AccessToken
+
+from src.cache import ResponseCache
+from src.http_transport import PooledTransport
+from src.models import FlightOffer, Itinerary, intern_code, intern_codes
+from src.price_calendar import PriceCalendar
+from src.rate_limiter import TokenBucket
+from src.token_cache import TokenCache
+from src.replay import Cassette, REPLAY_MODES, cassette_key
 
 logger = logging.getLogger(__name__)
 
+# HTTP status codes worth retrying (None = network error, no response)
+RETRYABLE_STATUS_CODES = {None, 429, 500, 502, 503, 504}
+
+# Limits of the POST flight-offers search
+MAX_DATE_WINDOW_DAYS = 3
+MAX_ALTERNATIVE_AIRPORTS = 2
+
+
+class _Call:
+    """A single in-flight or completed coalesced call"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.finished = False
+
+
+class SingleFlight:
+    """
+    Coalesces identical requests into one underlying call
+    
+    Concurrent callers with the same key wait for the first caller's
+    result. Up to max_completed successful results are kept until reset()
+    so repeated requests within a run share them too; failures are not kept.
+    """
+    
+    def __init__(self, max_completed: int = 1000):
+        self.max_completed = max_completed
+        self._calls: "OrderedDict[Hashable, _Call]" = OrderedDict()
+        self._completed = 0
+        self._lock = threading.Lock()
+        self.coalesced = 0
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key and share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+        
+        if is_leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+                with self._lock:
+                    self._calls.pop(key, None)
+            else:
+                with self._lock:
+                    call.finished = True
+                    self._completed += 1
+                    self._evict_completed()
+            finally:
+                call.done.set()
+        else:
+            call.done.wait()
+        
+        if call.error is not None:
+            raise call.error
+        
+        return call.result
+    
+    def _evict_completed(self):
+        """Drop the oldest completed results beyond max_completed (lock held)"""
+        for key in list(self._calls):
+            if self._completed <= self.max_completed:
+                break
+            if self._calls[key].finished:
+                del self._calls[key]
+                self._completed -= 1
+    
+    def reset(self):
+        """Forget completed calls and reset the counter (e.g. at the start of a run)"""
+        with self._lock:
+            self._calls = OrderedDict(
+                (key, call) for key, call in self._calls.items()
+                if not call.finished
+            )
+            self._completed = 0
+            self.coalesced = 0
+
 
 class FlightAPI:
     """Amadeus API client wrapper"""
     
-    def __init__(self, api_key: str, api_secret: str):
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        max_retries: int = 3,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 30.0,
+        client_options: Optional[Dict[str, Any]] = None,
+        replay_mode: str = 'off',
+        cassette: Optional[Cassette] = None,
+        transport: Optional[PooledTransport] = None,
+        token_cache: Optional[TokenCache] = None
+    ):
+        if replay_mode not in REPLAY_MODES:
+            raise ValueError(f"Unknown replay mode: {replay_mode}")
+        if replay_mode != 'off' and cassette is None:
+            raise ValueError(f"Replay mode '{replay_mode}' requires a cassette")
+        
+        # client_options can point the client at another host,
+        # e.g. {'host': 'localhost', 'port': 8088, 'ssl': False}
+        client_options = dict(client_options or {})
+        if transport is not None:
+            client_options['http'] = transport
+        
         self.client = Client(
             client_id=api_key,
-            client_secret=api_secret
+            client_secret=api_secret,
+            **client_options
         )
+        self.transport = transport
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.coalescer = SingleFlight()
+        self.api_calls = 0
+        self._api_calls_lock = threading.Lock()
+        self.replay_mode = replay_mode
+        self.cassette = cassette
+        self.token_cache = token_cache
+        self._token_fingerprint = TokenCache.fingerprint(api_key, self.client.host)
+        self._token_lock = threading.Lock()
+        self._saved_token = None
+        self._token_from_cache = False
+        self._load_cached_token()
         logger.info("Amadeus API client initialized")
     
+    def close(self):
+        """Save recorded responses and release pooled HTTP and cache connections"""
+        if self.cassette is not None:
+            self.cassette.close()
+        if self.cache is not None:
+            self.cache.close()
+        if self.transport is not None:
+            self.transport.close()
+    
     def search_flights(
         self,
         origin: str,
@@ -28,7 +181,7 @@ class FlightAPI:
         return_date: datetime,
         adults: int = 1,
         max_results: int = 10
-    ) -> List[Dict[str, Any]]:
+    ) -> List[FlightOffer]:
         """
         Search for round-trip flights
         
@@ -43,43 +196,354 @@ class FlightAPI:
         Returns:
             List of flight offers
         """
+        cache_key = (
+            origin,
+            destination,
+            departure_date.strftime('%Y-%m-%d'),
+            return_date.strftime('%Y-%m-%d'),
+            adults,
+            max_results
+        )
+        
+        if self.cache:
+            flights = self.cache.get(cache_key)
+            if flights is not None:
+                logger.debug(f"Cache hit: {origin} → {destination}, {cache_key[2]} - {cache_key[3]}")
+                return list(self._parse_flight_offers(flights))
+        
         try:
-            logger.info(
-                f"Searching flights: {origin} → {destination}, "
-                f"{departure_date.date()} - {return_date.date()}"
+            flights = self.coalescer.do(
+                cache_key,
+                lambda: self._fetch_flight_offers(cache_key)
             )
             
-            response = self.client.shopping.flight_offers_search.get(
+            return list(self._parse_flight_offers(flights))
+            
+        except ResponseError as error:
+            logger.error(f"Amadeus API error: {error}")
+            return []
+        except Exception as e:
+            logger.error(f"Flight search error: {e}")
+            return []
+    
+    def _fetch_flight_offers(self, cache_key: tuple) -> List[Any]:
+        """Fetch raw offers for a query tuple from the API and cache them"""
+        origin, destination, departure_date, return_date, adults, max_results = cache_key
+        
+        if self.replay_mode == 'replay':
+            flights = self.cassette.get(cache_key)
+            if flights is None:
+                logger.warning(f"No recorded response for {cassette_key(cache_key)}")
+                return []
+            return flights
+        
+        logger.info(
+            f"Searching flights: {origin} → {destination}, "
+            f"{departure_date} - {return_date}"
+        )
+        
+        response = self._call_with_retry(
+            lambda: self.client.shopping.flight_offers_search.get(
                 originLocationCode=origin,
                 destinationLocationCode=destination,
-                departureDate=departure_date.strftime('%Y-%m-%d'),
-                returnDate=return_date.strftime('%Y-%m-%d'),
+                departureDate=departure_date,
+                returnDate=return_date,
                 adults=adults,
                 currencyCode='PLN',
                 max=max_results
             )
+        )
+        
+        flights = response.data if hasattr(response, 'data') else []
+        logger.info(f"Found {len(flights)} flight offers")
+        
+        if self.replay_mode == 'record':
+            self.cassette.record(cache_key, flights)
+        
+        if self.cache:
+            self.cache.set(cache_key, flights)
+        
+        return flights
+    
+    def search_flights_batch(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: datetime,
+        return_date: datetime,
+        date_window_days: int = 0,
+        alternative_origins: Optional[List[str]] = None,
+        alternative_destinations: Optional[List[str]] = None,
+        adults: int = 1,
+        max_results: int = 10
+    ) -> List[FlightOffer]:
+        """
+        Search several date and airport variants in one POST request
+        
+        Uses the POST flight-offers endpoint, which accepts a +/- day window
+        on each leg and alternative origin/destination airports. Offers come
+        back for whichever variant is cheapest, so the route and dates of
+        each offer are filled in from its itineraries.
+        
+        Args:
+            origin: Origin airport code
+            destination: Destination airport code
+            departure_date: Centre of the departure date window
+            return_date: Centre of the return date window
+            date_window_days: Days either side of each date to search (0-3)
+            alternative_origins: Extra origin airports (up to 2)
+            alternative_destinations: Extra destination airports (up to 2)
+            adults: Number of adult passengers
+            max_results: Maximum number of results to return
+        
+        Returns:
+            List of flight offers with route and date metadata
+        """
+        alternative_origins = list(alternative_origins or [])[:MAX_ALTERNATIVE_AIRPORTS]
+        alternative_destinations = list(alternative_destinations or [])[:MAX_ALTERNATIVE_AIRPORTS]
+        date_window_days = max(0, min(date_window_days, MAX_DATE_WINDOW_DAYS))
+        
+        body = {
+            'currencyCode': 'PLN',
+            'originDestinations': [
+                self._origin_destination(
+                    '1', origin, destination, departure_date, date_window_days,
+                    alternative_origins, alternative_destinations
+                ),
+                self._origin_destination(
+                    '2', destination, origin, return_date, date_window_days,
+                    alternative_destinations, alternative_origins
+                )
+            ],
+            'travelers': [
+                {'id': str(i + 1), 'travelerType': 'ADULT'}
+                for i in range(adults)
+            ],
+            'sources': ['GDS'],
+            'searchCriteria': {'maxFlightOffers': max_results}
+        }
+        cache_key = ('flight-offers-post', json.dumps(body, sort_keys=True))
+        
+        try:
+            flights = self.cache.get(cache_key) if self.cache else None
             
-            flights = response.data if hasattr(response, 'data') else []
-            logger.info(f"Found {len(flights)} flight offers")
+            if flights is None:
+                flights = self.coalescer.do(
+                    cache_key,
+                    lambda: self._fetch_batch_offers(cache_key, body)
+                )
             
-            return self._parse_flight_offers(flights)
+            offers = []
+            for offer in self._parse_flight_offers(flights):
+                offer.origin = offer.outbound.departure_airport
+                offer.destination = offer.outbound.arrival_airport
+                offer.departure_date = (offer.outbound.departure_time or '')[:10]
+                offer.return_date = (offer.inbound.departure_time or '')[:10]
+                offer.trip_length = (
+                    datetime.strptime(offer.return_date, '%Y-%m-%d')
+                    - datetime.strptime(offer.departure_date, '%Y-%m-%d')
+                ).days
+                offers.append(offer)
+            
+            return offers
             
         except ResponseError as error:
             logger.error(f"Amadeus API error: {error}")
             return []
         except Exception as e:
-            logger.error(f"Flight search error: {e}")
+            logger.error(f"Flight batch search error: {e}")
             return []
     
-    def _parse_flight_offers(self, offers: List[Any]) -> List[Dict[str, Any]]:
-        """Parse Amadeus flight offers into simplified format"""
-        parsed_offers = []
+    @staticmethod
+    def _origin_destination(
+        leg_id: str,
+        origin: str,
+        destination: str,
+        date: datetime,
+        date_window_days: int,
+        alternative_origins: List[str],
+        alternative_destinations: List[str]
+    ) -> Dict[str, Any]:
+        """Build one originDestinations entry for a POST search"""
+        date_range = {'date': date.strftime('%Y-%m-%d')}
+        if date_window_days:
+            date_range['dateWindow'] = f"I{date_window_days}D"
+        
+        leg = {
+            'id': leg_id,
+            'originLocationCode': origin,
+            'destinationLocationCode': destination,
+            'departureDateTimeRange': date_range
+        }
+        if alternative_origins:
+            leg['alternativeOriginsCodes'] = alternative_origins
+        if alternative_destinations:
+            leg['alternativeDestinationsCodes'] = alternative_destinations
+        
+        return leg
+    
+    def _fetch_batch_offers(self, cache_key: tuple, body: Dict[str, Any]) -> List[Any]:
+        """Fetch raw offers for a POST search body and cache them"""
+        if self.replay_mode == 'replay':
+            flights = self.cassette.get(cache_key)
+            if flights is None:
+                logger.warning("No recorded response for batch search")
+                return []
+            return flights
+        
+        legs = body['originDestinations']
+        logger.info(
+            f"Batch searching flights: {legs[0]['originLocationCode']} → "
+            f"{legs[0]['destinationLocationCode']}, "
+            f"{legs[0]['departureDateTimeRange']} - {legs[1]['departureDateTimeRange']}"
+        )
+        
+        response = self._call_with_retry(
+            lambda: self.client.shopping.flight_offers_search.post(body)
+        )
+        
+        flights = response.data if hasattr(response, 'data') else []
+        logger.info(f"Found {len(flights)} flight offers")
+        
+        if self.replay_mode == 'record':
+            self.cassette.record(cache_key, flights)
+        
+        if self.cache:
+            self.cache.set(cache_key, flights)
+        
+        return flights
+    
+    def _call_with_retry(self, request: Callable[[], Any]) -> Any:
+        """
+        Call the API through the shared rate limiter, retrying rate-limit
+        and server errors with exponential backoff and jitter
+        """
+        attempt = 0
         
+        while True:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            
+            with self._api_calls_lock:
+                self.api_calls += 1
+            
+            try:
+                result = request()
+                self._save_token()
+                return result
+            except ResponseError as error:
+                status_code = self._get_status_code(error)
+                
+                if status_code == 401 and self._drop_cached_token():
+                    continue
+                
+                if status_code not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+                    raise
+                
+                delay = self._get_retry_delay(error, attempt)
+                attempt += 1
+                
+                if status_code == 429 and self.rate_limiter:
+                    # Slow down every caller sharing the limiter, not just this one
+                    self.rate_limiter.penalize(delay)
+                
+                logger.warning(
+                    f"Amadeus API returned {status_code or 'network error'}, "
+                    f"retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})"
+                )
+                time.sleep(delay)
+    
+    def _load_cached_token(self):
+        """Seed the client with a cached OAuth token, if one is still valid"""
+        if self.token_cache is None:
+            return
+        
+        cached = self.token_cache.load(self._token_fingerprint)
+        if cached is None:
+            return
+        
+        access_token = AccessToken(self.client)
+        access_token.access_token, access_token.expires_at = cached
+        self.client.access_token = access_token
+        self._saved_token = access_token.access_token
+        self._token_from_cache = True
+        logger.info("Reusing cached Amadeus access token")
+    
+    def _save_token(self):
+        """Persist the client's OAuth token after it has been (re)issued"""
+        if self.token_cache is None:
+            return
+        
+        access_token = getattr(self.client, 'access_token', None)
+        token = getattr(access_token, 'access_token', None)
+        
+        if token is None or token == self._saved_token:
+            return
+        
+        with self._token_lock:
+            if token != self._saved_token:
+                self.token_cache.save(self._token_fingerprint, token, access_token.expires_at)
+                self._saved_token = token
+                self._token_from_cache = False
+    
+    def _drop_cached_token(self) -> bool:
+        """
+        Discard a cached token the API rejected, so the next call fetches a
+        new one
+        
+        Returns:
+            True if the rejected token came from the cache
+        """
+        with self._token_lock:
+            if not self._token_from_cache:
+                return False
+            
+            self._token_from_cache = False
+            self.client.access_token.expires_at = 0
+        
+        logger.info("Cached Amadeus access token was rejected, fetching a new one")
+        return True
+    
+    @staticmethod
+    def _get_status_code(error: ResponseError) -> Optional[int]:
+        """Get the HTTP status code from an Amadeus error"""
+        response = getattr(error, 'response', None)
+        return getattr(response, 'status_code', None)
+    
+    def _get_retry_delay(self, error: ResponseError, attempt: int) -> float:
+        """Backoff delay for a retry, honouring the Retry-After header"""
+        backoff = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        delay = random.uniform(backoff / 2, backoff)
+        
+        retry_after = self._get_retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max_seconds))
+        
+        return delay
+    
+    @staticmethod
+    def _get_retry_after(error: ResponseError) -> Optional[float]:
+        """Read the Retry-After header (in seconds) from an Amadeus error"""
+        response = getattr(error, 'response', None)
+        http_response = getattr(response, 'http_response', None)
+        headers = getattr(http_response, 'headers', None)
+        
+        if headers is None:
+            return None
+        
+        try:
+            value = headers.get('Retry-After')
+            return float(value) if value is not None else None
+        except (TypeError, ValueError):
+            return None
+    
+    def _parse_flight_offers(self, offers: List[Any]) -> Iterator[FlightOffer]:
+        """Parse Amadeus flight offers into simplified format, one at a time"""
         for offer in offers:
             try:
                 # Extract price
                 price = float(offer.get('price', {}).get('total', 0))
-                currency = offer.get('price', {}).get('currency', 'PLN')
+                currency = intern_code(offer.get('price', {}).get('currency', 'PLN'))
                 
                 # Extract itineraries (outbound and return)
                 itineraries = offer.get('itineraries', [])
@@ -90,30 +554,35 @@ class FlightAPI:
                 outbound = self._parse_itinerary(itineraries[0])
                 inbound = self._parse_itinerary(itineraries[1])
                 
-                parsed_offer = {
-                    'id': offer.get('id'),
-                    'price': price,
-                    'currency': currency,
-                    'outbound': outbound,
-                    'inbound': inbound,
-                    'total_stops': outbound['stops'] + inbound['stops'],
-                    'booking_link': self._generate_booking_link(offer)
-                }
+                if outbound is None or inbound is None:
+                    continue  # Missing segments
                 
-                parsed_offers.append(parsed_offer)
+                if (inbound.arrival_airport != outbound.departure_airport
+                        or inbound.departure_airport != outbound.arrival_airport):
+                    continue  # Open jaw (e.g. from alternative airports), not a round trip
+                
+                parsed_offer = FlightOffer(
+                    id=offer.get('id'),
+                    price=price,
+                    currency=currency,
+                    outbound=outbound,
+                    inbound=inbound,
+                    total_stops=outbound.stops + inbound.stops,
+                    booking_link=self._generate_booking_link(offer)
+                )
+                
+                yield parsed_offer
                 
             except Exception as e:
                 logger.warning(f"Error parsing offer: {e}")
                 continue
-        
-        return parsed_offers
     
-    def _parse_itinerary(self, itinerary: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_itinerary(self, itinerary: Dict[str, Any]) -> Optional[Itinerary]:
         """Parse a single itinerary (outbound or inbound)"""
         segments = itinerary.get('segments', [])
         
         if not segments:
-            return {}
+            return None
         
         first_segment = segments[0]
         last_segment = segments[-1]
@@ -133,30 +602,28 @@ class FlightAPI:
         
         # Extract connection info
         stops = len(segments) - 1
-        connections = []
-        
-        for i in range(len(segments) - 1):
-            connection_airport = segments[i].get('arrival', {}).get('iataCode')
-            if connection_airport:
-                connections.append(connection_airport)
+        connections = intern_codes(
+            segments[i].get('arrival', {}).get('iataCode')
+            for i in range(len(segments) - 1)
+        )
         
         # Extract airline info
-        airlines = list(set([
-            seg.get('carrierCode', '') 
+        airlines = intern_codes(sorted(set(
+            seg.get('carrierCode', '')
             for seg in segments
-        ]))
-        
-        return {
-            'departure_airport': departure_airport,
-            'departure_time': departure_time,
-            'arrival_airport': arrival_airport,
-            'arrival_time': arrival_time,
-            'duration': duration,
-            'stops': stops,
-            'connections': connections,
-            'airlines': airlines,
-            'segments': len(segments)
-        }
+        )))
+        
+        return Itinerary(
+            departure_airport=intern_code(departure_airport),
+            departure_time=departure_time,
+            arrival_airport=intern_code(arrival_airport),
+            arrival_time=arrival_time,
+            duration=duration,
+            stops=stops,
+            connections=connections,
+            airlines=airlines,
+            segments=len(segments)
+        )
     
     def _generate_booking_link(self, offer: Dict[str, Any]) -> str:
         """Generate Google Flights booking link"""
@@ -189,8 +656,10 @@ class FlightAPI:
         departure_end: datetime,
         trip_length_min: int,
         trip_length_max: int,
-        max_results_per_date: int = 5
-    ) -> List[Dict[str, Any]]:
+        max_results_per_date: int = 5,
+        top_k: Optional[int] = None,
+        as_calendar: bool = False
+    ) -> Union[List[FlightOffer], PriceCalendar]:
         """
         Search flights across multiple date combinations
         
@@ -202,30 +671,174 @@ class FlightAPI:
             trip_length_min: Minimum trip length in days
             trip_length_max: Maximum trip length in days
             max_results_per_date: Max results per date combination
+            top_k: If set, only fully price the K cheapest date pairs
+                found by a cheapest-date prefilter
+            as_calendar: Return a PriceCalendar (departure date x trip
+                length matrix of cheapest offers) instead of a flat list;
+                requires numpy
         
         Returns:
-            List of all flight offers found
+            List of all flight offers found, or a PriceCalendar
         """
         all_offers = []
-        current_date = departure_start
+        date_pairs = None
         
-        while current_date <= departure_end:
-            # Try different trip lengths
-            for trip_length in range(trip_length_min, trip_length_max + 1):
-                return_date = current_date + timedelta(days=trip_length)
-                
-                offers = self.search_flights(
-                    origin=origin,
-                    destination=destination,
-                    departure_date=current_date,
-                    return_date=return_date,
-                    max_results=max_results_per_date
-                )
+        if top_k:
+            candidates = self.search_cheapest_dates(
+                origin=origin,
+                destination=destination,
+                departure_start=departure_start,
+                departure_end=departure_end,
+                trip_length_min=trip_length_min,
+                trip_length_max=trip_length_max
+            )
+            
+            if candidates:
+                date_pairs = [
+                    (candidate['departure_date'], candidate['return_date'])
+                    for candidate in candidates[:top_k]
+                ]
+        
+        if date_pairs is None:
+            date_pairs = []
+            current_date = departure_start
+            
+            while current_date <= departure_end:
+                # Try different trip lengths
+                for trip_length in range(trip_length_min, trip_length_max + 1):
+                    date_pairs.append((current_date, current_date + timedelta(days=trip_length)))
                 
-                all_offers.extend(offers)
+                # Move to next day
+                current_date += timedelta(days=1)
+        
+        for departure_date, return_date in date_pairs:
+            offers = self.search_flights(
+                origin=origin,
+                destination=destination,
+                departure_date=departure_date,
+                return_date=return_date,
+                max_results=max_results_per_date
+            )
             
-            # Move to next day
-            current_date += timedelta(days=1)
+            self._tag_offers(offers, origin, destination, departure_date, return_date)
+            all_offers.extend(offers)
         
         logger.info(f"Flexible search found {len(all_offers)} total offers")
+        
+        if as_calendar:
+            return PriceCalendar.from_offers(
+                all_offers,
+                departure_start,
+                departure_end,
+                range(trip_length_min, trip_length_max + 1)
+            )
+        
         return all_offers
+    
+    def _tag_offers(
+        self,
+        offers: List[FlightOffer],
+        origin: str,
+        destination: str,
+        departure_date: datetime,
+        return_date: datetime
+    ):
+        """Fill in the route and date metadata of offers from one search"""
+        departure_str = departure_date.strftime('%Y-%m-%d')
+        return_str = return_date.strftime('%Y-%m-%d')
+        trip_length = (return_date - departure_date).days
+        
+        for offer in offers:
+            offer.origin = origin
+            offer.destination = destination
+            offer.departure_date = departure_str
+            offer.return_date = return_str
+            offer.trip_length = trip_length
+    
+    def search_cheapest_dates(
+        self,
+        origin: str,
+        destination: str,
+        departure_start: datetime,
+        departure_end: datetime,
+        trip_length_min: int,
+        trip_length_max: int
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank date pairs using the Amadeus cheapest-date (flight-dates) endpoint
+        
+        This is a single cheap call served from Amadeus' cached prices, so it
+        can be used to pick which dates are worth a full offer search. Not
+        every route is covered; an empty list means no ranking is available.
+        
+        Returns:
+            List of {'departure_date', 'return_date', 'price'} sorted by price
+        """
+        cache_key = (
+            'flight-dates',
+            origin,
+            destination,
+            departure_start.strftime('%Y-%m-%d'),
+            departure_end.strftime('%Y-%m-%d'),
+            trip_length_min,
+            trip_length_max
+        )
+        
+        dates = self.cache.get(cache_key) if self.cache else None
+        
+        if dates is None:
+            try:
+                dates = self.coalescer.do(
+                    cache_key,
+                    lambda: self._fetch_cheapest_dates(cache_key)
+                )
+            except ResponseError as error:
+                logger.info(f"Cheapest-date search unavailable for {origin} → {destination}: {error}")
+                return []
+            except Exception as e:
+                logger.error(f"Cheapest-date search error: {e}")
+                return []
+        
+        candidates = []
+        for item in dates:
+            try:
+                candidates.append({
+                    'departure_date': datetime.strptime(item['departureDate'], '%Y-%m-%d'),
+                    'return_date': datetime.strptime(item['returnDate'], '%Y-%m-%d'),
+                    'price': float(item.get('price', {}).get('total', 0))
+                })
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Error parsing cheapest date: {e}")
+                continue
+        
+        candidates.sort(key=lambda c: (c['price'], c['departure_date'], c['return_date']))
+        logger.info(f"Cheapest-date search ranked {len(candidates)} date pairs")
+        
+        return candidates
+
+    
+    def _fetch_cheapest_dates(self, cache_key: tuple) -> List[Any]:
+        """Fetch raw cheapest-date results for a query tuple and cache them"""
+        _, origin, destination, departure_start, departure_end, trip_length_min, trip_length_max = cache_key
+        
+        if self.replay_mode == 'replay':
+            return self.cassette.get(cache_key) or []
+        
+        response = self._call_with_retry(
+            lambda: self.client.shopping.flight_dates.get(
+                origin=origin,
+                destination=destination,
+                departureDate=f"{departure_start},{departure_end}",
+                duration=f"{trip_length_min},{trip_length_max}",
+                oneWay='false'
+            )
+        )
+        dates = response.data if hasattr(response, 'data') else []
+        
+        if self.replay_mode == 'record':
+            self.cassette.record(cache_key, dates)
+        
+        if self.cache:
+            self.cache.set(cache_key, dates)
+        
+        return dates
@@ -0,0 +1,134 @@
+"""
+Pooled HTTP transport - keep-alive (and HTTP/2) connections for the Amadeus client
+"""
+
+import importlib.util
+import logging
+from typing import Any, List, Optional, Tuple
+from urllib.error import URLError
+from urllib.request import Request
+
+try:
+    import httpx
+except ImportError:  # optional, preferred backend
+    httpx = None
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+
+class TransportResponse:
+    """The subset of http.client.HTTPResponse the Amadeus SDK reads"""
+
+    def __init__(self, status: int, headers: Any, body: bytes):
+        self.status = status
+        self.code = status
+        self.headers = headers  # case-insensitive mapping
+        self._body = body
+
+    def read(self) -> bytes:
+        return self._body
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name, default)
+
+    def getheaders(self) -> List[Tuple[str, str]]:
+        # The SDK copies these into a plain dict and looks up 'Content-Type',
+        # but HTTP/2 header names are always lower-case
+        return [
+            ('-'.join(part.capitalize() for part in name.split('-')), value)
+            for name, value in self.headers.items()
+        ]
+
+
+class PooledTransport:
+    """
+    Drop-in replacement for urllib's urlopen that reuses connections
+
+    Passed to amadeus.Client as its `http` option, so every search on the
+    client shares one connection pool instead of paying a TCP + TLS
+    handshake per call. Uses httpx (with HTTP/2 when the h2 package is
+    installed) or falls back to a requests.Session pool.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 10,
+        timeout_seconds: float = 30.0,
+        http2: bool = True
+    ):
+        """
+        Args:
+            max_connections: Pool size; match it to the number of concurrent searches
+            timeout_seconds: Connect/read timeout per request
+            http2: Use HTTP/2 if httpx and h2 are installed
+        """
+        self.timeout_seconds = timeout_seconds
+
+        if httpx is not None:
+            self.http2 = http2 and importlib.util.find_spec('h2') is not None
+            self._client = httpx.Client(
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections
+                ),
+                timeout=timeout_seconds
+            )
+            self.backend = 'httpx'
+        elif requests is not None:
+            self.http2 = False
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_connections)
+            self._client.mount('https://', adapter)
+            self._client.mount('http://', adapter)
+            self.backend = 'requests'
+        else:
+            raise ImportError(
+                "Pooled transport requires httpx or requests. "
+                "Install one with: pip install httpx"
+            )
+
+        logger.info(
+            f"Pooled HTTP transport: {self.backend}"
+            f"{' (HTTP/2)' if self.http2 else ''}, {max_connections} connections"
+        )
+
+    def __call__(self, request: Request, timeout: Optional[float] = None) -> TransportResponse:
+        """
+        Send a urllib Request over the pool
+
+        Like urlopen, network failures raise URLError (which the SDK turns
+        into a NetworkError); HTTP error statuses are returned, not raised.
+        """
+        method = request.get_method()
+        headers = dict(request.header_items())
+        timeout = timeout or self.timeout_seconds
+
+        if self.backend == 'httpx':
+            try:
+                response = self._client.request(
+                    method, request.full_url, headers=headers,
+                    content=request.data, timeout=timeout
+                )
+            except httpx.HTTPError as e:
+                raise URLError(e)
+            return TransportResponse(response.status_code, response.headers, response.content)
+
+        try:
+            response = self._client.request(
+                method, request.full_url, headers=headers,
+                data=request.data, timeout=timeout
+            )
+        except requests.RequestException as e:
+            raise URLError(e)
+        return TransportResponse(response.status_code, response.headers, response.content)
+
+    def close(self):
+        """Close all pooled connections"""
+        self._client.close()
@@ -0,0 +1,93 @@
+"""
+Compact flight offer models shared by the API client, analyzer, database and emails
+"""
+
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+# __slots__ keeps many offers small in memory; dataclass(slots=True) needs
+# Python 3.10, so on 3.9 these fall back to regular dataclasses
+_slotted_dataclass = dataclass(slots=True) if sys.version_info >= (3, 10) else dataclass
+
+
+def intern_code(code: Optional[str]) -> Optional[str]:
+    """Intern an airport/airline/currency code so repeated codes share one string"""
+    return sys.intern(code) if isinstance(code, str) else code
+
+
+def intern_codes(codes: Iterable[Optional[str]]) -> Tuple[str, ...]:
+    """Intern a sequence of codes into a tuple, dropping empty values"""
+    return tuple(intern_code(code) for code in codes if code)
+
+
+@_slotted_dataclass
+class Itinerary:
+    """One direction (outbound or inbound) of a round trip"""
+    departure_airport: Optional[str]
+    departure_time: Optional[str]
+    arrival_airport: Optional[str]
+    arrival_time: Optional[str]
+    duration: str
+    stops: int
+    connections: Tuple[str, ...]
+    airlines: Tuple[str, ...]
+    segments: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict (e.g. for storage)"""
+        return {
+            'departure_airport': self.departure_airport,
+            'departure_time': self.departure_time,
+            'arrival_airport': self.arrival_airport,
+            'arrival_time': self.arrival_time,
+            'duration': self.duration,
+            'stops': self.stops,
+            'connections': list(self.connections),
+            'airlines': list(self.airlines),
+            'segments': self.segments
+        }
+
+
+@_slotted_dataclass
+class FlightOffer:
+    """A priced round-trip flight offer"""
+    id: Optional[str]
+    price: float
+    currency: str
+    outbound: Itinerary
+    inbound: Itinerary
+    total_stops: int
+    booking_link: str
+
+    # Search metadata, filled in by the scheduler
+    origin: Optional[str] = None
+    destination: Optional[str] = None
+    departure_date: Optional[str] = None
+    return_date: Optional[str] = None
+    trip_length: Optional[int] = None
+
+    # Analysis results, filled in by the analyzer
+    analysis: Optional[Dict[str, Any]] = None
+
+    @property
+    def route(self) -> str:
+        return f"{self.origin}-{self.destination}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a plain dict (without analysis) for storage"""
+        return {
+            'id': self.id,
+            'price': self.price,
+            'currency': self.currency,
+            'outbound': self.outbound.to_dict(),
+            'inbound': self.inbound.to_dict(),
+            'total_stops': self.total_stops,
+            'booking_link': self.booking_link,
+            'origin': self.origin,
+            'destination': self.destination,
+            'departure_date': self.departure_date,
+            'return_date': self.return_date,
+            'trip_length': self.trip_length
+        }
@@ -0,0 +1,87 @@
+"""
+Offer payload codec - compact, content-addressed encoding of raw offer data
+"""
+
+import hashlib
+import json
+import zlib
+from typing import Any
+
+try:
+    import msgpack
+except ImportError:  # optional, falls back to JSON
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # optional, falls back to zlib
+    zstandard = None
+
+# First byte of every blob: serializer in the high nibble, compression in the low
+SERIALIZER_JSON = 0
+SERIALIZER_MSGPACK = 1
+
+COMPRESSION_NONE = 0
+COMPRESSION_ZLIB = 1
+COMPRESSION_ZSTD = 2
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def canonical_json(data: Any) -> bytes:
+    """Deterministic JSON encoding (sorted keys, no whitespace)"""
+    return json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def content_hash(data: Any) -> bytes:
+    """
+    16-byte content address of a payload
+
+    Computed over canonical JSON, so the same payload gets the same hash
+    whichever serializer and compressor are installed.
+    """
+    return hashlib.blake2b(canonical_json(data), digest_size=16).digest()
+
+
+def encode(data: Any) -> bytes:
+    """Serialize and compress a payload, prefixed with a codec header byte"""
+    if msgpack is not None:
+        serializer = SERIALIZER_MSGPACK
+        payload = msgpack.packb(data, use_bin_type=True)
+    else:
+        serializer = SERIALIZER_JSON
+        payload = canonical_json(data)
+
+    if zstandard is not None:
+        compression = COMPRESSION_ZSTD
+        payload = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    else:
+        compression = COMPRESSION_ZLIB
+        payload = zlib.compress(payload, ZLIB_LEVEL)
+
+    return bytes([(serializer << 4) | compression]) + payload
+
+
+def decode(blob: bytes) -> Any:
+    """Decode a blob written by encode() back into Python objects"""
+    serializer, compression = blob[0] >> 4, blob[0] & 0x0F
+    payload = blob[1:]
+
+    if compression == COMPRESSION_ZSTD:
+        if zstandard is None:
+            raise ImportError("This offer blob is zstd-compressed. Install with: pip install zstandard")
+        payload = zstandard.ZstdDecompressor().decompress(payload)
+    elif compression == COMPRESSION_ZLIB:
+        payload = zlib.decompress(payload)
+    elif compression != COMPRESSION_NONE:
+        raise ValueError(f"Unknown offer blob compression: {compression}")
+
+    if serializer == SERIALIZER_MSGPACK:
+        if msgpack is None:
+            raise ImportError("This offer blob is msgpack-encoded. Install with: pip install msgpack")
+        return msgpack.unpackb(payload, raw=False)
+    if serializer == SERIALIZER_JSON:
+        return json.loads(payload)
+
+    raise ValueError(f"Unknown offer blob serializer: {serializer}")
@@ -0,0 +1,156 @@
+"""
+Price calendar - dense departure date x trip length matrix of cheapest offers
+"""
+
+import logging
+import warnings
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, only needed for calendar mode
+    np = None
+
+from src.models import FlightOffer
+
+logger = logging.getLogger(__name__)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError(
+            "Price calendar requires numpy. Install it with: pip install numpy"
+        )
+
+
+class PriceCalendar:
+    """
+    Cheapest price per (departure date, trip length) cell
+
+    prices is a float matrix with departure dates on axis 0 and trip
+    lengths on axis 1; cells without offers are NaN. offers is a parallel
+    object matrix holding the cheapest FlightOffer of each cell (or None).
+    """
+
+    def __init__(
+        self,
+        departure_dates: Sequence[datetime],
+        trip_lengths: Sequence[int],
+        prices: "np.ndarray",
+        offers: "np.ndarray"
+    ):
+        _require_numpy()
+
+        self.departure_dates = list(departure_dates)
+        self.trip_lengths = list(trip_lengths)
+        self.prices = prices
+        self.offers = offers
+
+    @classmethod
+    def from_offers(
+        cls,
+        offers: Iterable[FlightOffer],
+        departure_start: datetime,
+        departure_end: datetime,
+        trip_lengths: Sequence[int]
+    ) -> "PriceCalendar":
+        """
+        Build a calendar from offers tagged with departure_date and trip_length
+
+        Offers outside the date range or trip lengths are ignored.
+        """
+        _require_numpy()
+
+        num_days = max(0, (departure_end - departure_start).days) + 1
+        departure_dates = [departure_start + timedelta(days=i) for i in range(num_days)]
+        trip_lengths = list(trip_lengths)
+
+        date_index = {d.strftime('%Y-%m-%d'): i for i, d in enumerate(departure_dates)}
+        length_index = {length: j for j, length in enumerate(trip_lengths)}
+
+        prices = np.full((num_days, len(trip_lengths)), np.nan)
+        cells = np.full((num_days, len(trip_lengths)), None, dtype=object)
+
+        for offer in offers:
+            i = date_index.get(offer.departure_date)
+            j = length_index.get(offer.trip_length)
+
+            if i is None or j is None:
+                continue
+
+            if np.isnan(prices[i, j]) or offer.price < prices[i, j]:
+                prices[i, j] = offer.price
+                cells[i, j] = offer
+
+        return cls(departure_dates, trip_lengths, prices, cells)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.prices.shape
+
+    @property
+    def is_empty(self) -> bool:
+        return not np.any(~np.isnan(self.prices))
+
+    def argmin(self) -> Optional[Tuple[int, int]]:
+        """(departure index, trip length index) of the cheapest cell"""
+        if self.is_empty:
+            return None
+
+        row, col = np.unravel_index(int(np.nanargmin(self.prices)), self.prices.shape)
+        return int(row), int(col)
+
+    def cheapest(self) -> Optional[FlightOffer]:
+        """The cheapest offer in the calendar"""
+        index = self.argmin()
+        return self.offers[index] if index is not None else None
+
+    def best_price(self) -> Optional[float]:
+        """The cheapest price in the calendar"""
+        return None if self.is_empty else float(np.nanmin(self.prices))
+
+    def rolling_min(self, window: int) -> "np.ndarray":
+        """
+        Cheapest price per trip length over each run of `window` departure days
+
+        Returns:
+            Matrix of shape (num_days - window + 1, num_trip_lengths); row i
+            covers departures i .. i + window - 1. NaN where no offers.
+        """
+        window = max(1, min(window, self.prices.shape[0]))
+        windows = np.lib.stride_tricks.sliding_window_view(self.prices, window, axis=0)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)  # all-NaN windows
+            return np.nanmin(windows, axis=-1)
+
+    def cheapest_window(self, window: int) -> Optional[Tuple[datetime, float]]:
+        """Start date and price of the cheapest run of `window` departure days"""
+        minima = self.rolling_min(window)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            per_start = np.nanmin(minima, axis=1)
+
+        if np.all(np.isnan(per_start)):
+            return None
+
+        start = int(np.nanargmin(per_start))
+        return self.departure_dates[start], float(per_start[start])
+
+    def within_percent_of_best(self, percent: float) -> "np.ndarray":
+        """Boolean mask of cells priced within `percent` % of the cheapest"""
+        best = self.best_price()
+
+        if best is None:
+            return np.zeros(self.prices.shape, dtype=bool)
+
+        with np.errstate(invalid='ignore'):
+            return self.prices <= best * (1 + percent / 100)
+
+    def offers_within_percent_of_best(self, percent: float) -> List[FlightOffer]:
+        """Offers of the cells within `percent` % of the cheapest, cheapest first"""
+        mask = self.within_percent_of_best(percent)
+        order = np.argsort(self.prices[mask], kind='stable')
+        return list(self.offers[mask][order])
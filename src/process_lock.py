@@ -0,0 +1,83 @@
+"""
+Process lock - advisory file lock that keeps runs from overlapping across processes
+"""
+
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Optional, TextIO
+
+if sys.platform == 'win32':
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+
+class ProcessLock:
+    """
+    Exclusive lock on a file, held by one run at a time
+
+    Price checks and database maintenance both take it, so a cron-driven
+    `--once` waits for a `--maintenance` (whose one-time VACUUM can hold
+    the database's write lock for longer than busy_timeout) instead of
+    failing with "database is locked". The OS drops the lock if the
+    process dies, so it never goes stale.
+    """
+
+    def __init__(self, path: str, poll_seconds: float = 1.0):
+        """
+        Args:
+            path: Lock file location (created if missing)
+            poll_seconds: How often to retry while another run holds it
+        """
+        self.path = path
+        self.poll_seconds = poll_seconds
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> 'ProcessLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def acquire(self):
+        """Take the lock, waiting for the run that holds it to finish"""
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'a')
+
+        if self._try_lock():
+            return
+
+        logger.info(f"Waiting for another run to release {self.path}...")
+        while not self._try_lock():
+            time.sleep(self.poll_seconds)
+
+    def release(self):
+        """Release the lock"""
+        if self._file is None:
+            return
+
+        try:
+            if sys.platform == 'win32':
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def _try_lock(self) -> bool:
+        try:
+            if sys.platform == 'win32':
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
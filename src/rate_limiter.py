@@ -0,0 +1,67 @@
+"""
+Token-bucket rate limiter shared by all API callers
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting requests per second"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate: Tokens added per second (sustained requests per second)
+            capacity: Maximum burst size (defaults to one second of tokens)
+        """
+        if rate <= 0:
+            raise ValueError("Rate limiter rate must be positive")
+
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+
+        self._tokens = self.capacity
+        self._last_refill = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add tokens for the time elapsed since the last refill"""
+        if now <= self._last_refill:
+            return
+
+        elapsed = now - self._last_refill
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._last_refill = now
+
+    def acquire(self, tokens: float = 1.0):
+        """Block until the requested number of tokens is available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._blocked_until:
+                    wait = self._blocked_until - now
+                elif self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                else:
+                    wait = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """
+        Pause all callers for a while (e.g. after the API returned 429)
+
+        Also drains the bucket so callers don't burst straight back into
+        the limit once the pause ends.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + seconds)
+            self._tokens = 0.0
+            self._last_refill = max(now, self._blocked_until)
@@ -0,0 +1,83 @@
+"""
+Cassette files for recording and replaying Amadeus search responses
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ('off', 'record', 'replay')
+
+
+def cassette_key(key: Tuple) -> str:
+    """Turn a query tuple into the string key used in cassette files"""
+    return '|'.join(str(part) for part in key)
+
+
+class Cassette:
+    """
+    JSON file mapping search query keys to raw API responses
+
+    Recorded responses are kept in memory and written out by flush() or
+    close(), not after every response.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._responses: Dict[str, Any] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load recorded responses from disk if the file exists"""
+        cassette_file = Path(self.path)
+
+        if not cassette_file.exists():
+            return
+
+        with open(cassette_file, 'r', encoding='utf-8') as f:
+            self._responses = json.load(f).get('responses', {})
+
+        logger.info(f"Loaded {len(self._responses)} recorded responses from {self.path}")
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """Get a recorded response, or None if the query was never recorded"""
+        with self._lock:
+            return self._responses.get(cassette_key(key))
+
+    def record(self, key: Tuple, response: Any):
+        """Record a response (written to disk on flush/close)"""
+        with self._lock:
+            self._responses[cassette_key(key)] = response
+            self._dirty = True
+
+    def flush(self):
+        """Write the cassette to disk if anything was recorded since the last write"""
+        with self._lock:
+            if self._dirty:
+                self._save()
+                self._dirty = False
+                logger.info(f"Saved {len(self._responses)} recorded responses to {self.path}")
+
+    def close(self):
+        """Write any unsaved recordings"""
+        self.flush()
+
+    def _save(self):
+        """Atomically write the cassette file"""
+        cassette_file = Path(self.path)
+        cassette_file.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'responses': self._responses}, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self._responses)
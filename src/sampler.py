@@ -0,0 +1,111 @@
+"""
+Adaptive date sampler - spends the search budget on the most promising dates
+"""
+
+import logging
+import math
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveDateSampler:
+    """
+    Thompson sampling over (departure date, trip length) combinations
+
+    Each combination is an arm whose price is modelled as a normal
+    distribution. Arms with price history get a posterior centred on their
+    observed average; unobserved arms keep the route-wide prior, so they
+    still get explored. Each run draws a price for every arm and searches
+    the arms with the lowest draws.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        exploration: float = 1.0,
+        seed: Optional[int] = None
+    ):
+        """
+        Args:
+            database: Price history source
+            exploration: Scales the prior spread; higher explores unseen dates more
+            seed: Random seed (for reproducible runs)
+        """
+        self.db = database
+        self.exploration = max(exploration, 0.01)
+        self._rng = random.Random(seed)
+
+    def select(
+        self,
+        route: str,
+        start_date: datetime,
+        end_date: datetime,
+        trip_lengths: Sequence[int],
+        budget: int
+    ) -> Optional[List[Tuple[datetime, int]]]:
+        """
+        Pick the (departure date, trip length) pairs to search this run
+
+        Returns:
+            Pairs sorted by date, or None if there's no history to learn from
+        """
+        history = self.db.get_date_pair_history(route, start_date, end_date)
+
+        if not history:
+            return None
+
+        prior_mean, prior_sd = self._route_prior(history)
+        observed = {
+            (row['departure_date'], row['trip_length']): row
+            for row in history
+        }
+
+        total_days = max(0, (end_date - start_date).days)
+        draws = []
+
+        for offset in range(total_days + 1):
+            dep_date = start_date + timedelta(days=offset)
+            date_key = dep_date.strftime('%Y-%m-%d')
+
+            for length in trip_lengths:
+                mean, sd = self._posterior(observed.get((date_key, length)), prior_mean, prior_sd)
+                draws.append((self._rng.gauss(mean, sd), dep_date, length))
+
+        draws.sort(key=lambda draw: draw[0])
+        selected = sorted((dep_date, length) for _, dep_date, length in draws[:budget])
+
+        logger.debug(f"Adaptive sampler picked {len(selected)} of {len(draws)} date pairs for {route}")
+        return selected
+
+    def _route_prior(self, history: List[Dict[str, float]]) -> Tuple[float, float]:
+        """Route-wide mean and spread of prices across all observed arms"""
+        count = sum(row['num_checks'] for row in history)
+        mean = sum(row['avg_price'] * row['num_checks'] for row in history) / count
+        mean_sq = sum(row['avg_sq_price'] * row['num_checks'] for row in history) / count
+        sd = math.sqrt(max(mean_sq - mean * mean, 0.0))
+
+        # Avoid a degenerate prior when all observed prices are equal
+        return mean, max(sd, mean * 0.05, 1.0)
+
+    def _posterior(
+        self,
+        row: Optional[Dict[str, float]],
+        prior_mean: float,
+        prior_sd: float
+    ) -> Tuple[float, float]:
+        """Normal posterior mean and spread for one arm"""
+        prior_var = (prior_sd * self.exploration) ** 2
+
+        if row is None or not row['num_checks']:
+            return prior_mean, math.sqrt(prior_var)
+
+        noise_var = prior_sd ** 2
+        precision = 1 / prior_var + row['num_checks'] / noise_var
+        mean = (prior_mean / prior_var + row['num_checks'] * row['avg_price'] / noise_var) / precision
+
+        return mean, math.sqrt(1 / precision)
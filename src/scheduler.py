@@ -3,20 +3,49 @@ Scheduler for automated flight price checks
 """
 
 import logging
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, NamedTuple, Optional, Iterator, Tuple
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
 from src.config import get_config
-from src.flight_api import FlightAPI
-from src.database import Database
+from src.cache import ResponseCache
+from src.http_transport import PooledTransport
+from src.flight_api import FlightAPI, MAX_ALTERNATIVE_AIRPORTS, MAX_DATE_WINDOW_DAYS
+from src.models import FlightOffer
+from src.price_calendar import PriceCalendar
+from src.process_lock import ProcessLock
+from src.rate_limiter import TokenBucket
+from src.replay import Cassette
+from src.token_cache import TokenCache
+from src.database import Database, DatabaseWriter
 from src.analyzer import PriceAnalyzer
+from src.budget import CallBudgetPlanner
+from src.sampler import AdaptiveDateSampler
+from src.staleness import StalenessFilter
 from src.email_sender import EmailSender
 
 logger = logging.getLogger(__name__)
 
 
+class SearchTask(NamedTuple):
+    """A single (route, departure date, trip length) combination to search"""
+    origin: str
+    destination: str
+    departure_date: datetime
+    return_date: datetime
+    trip_length: int
+    date_window: int = 0
+    alternative_origins: Tuple[str, ...] = ()
+    period: str = ''
+    priority: float = 1.0
+
+
 class FlightBot:
     """Main flight deal bot orchestrator"""
     
@@ -26,62 +55,226 @@ class FlightBot:
         # Initialize components
         self.api = FlightAPI(
             api_key=self.config.amadeus_api_key,
-            api_secret=self.config.amadeus_api_secret
+            api_secret=self.config.amadeus_api_secret,
+            cache=self._create_response_cache(),
+            rate_limiter=TokenBucket(
+                rate=self.config.get('api.requests_per_second', 5)
+            ),
+            max_retries=self.config.get('api.max_retries', 3),
+            backoff_base_seconds=self.config.get('api.backoff_base_seconds', 1.0),
+            backoff_max_seconds=self.config.get('api.backoff_max_seconds', 30.0),
+            client_options=self.config.get('api.client_options'),
+            replay_mode=self.config.get('api.replay.mode', 'off'),
+            cassette=self._create_cassette(),
+            transport=self._create_transport(),
+            token_cache=self._create_token_cache()
         )
         self.db = Database(db_path=self.config.database_path)
+        self.writer = self._create_writer()
         self.analyzer = PriceAnalyzer(self.db, self.config)
+        self.sampler = AdaptiveDateSampler(
+            self.db,
+            exploration=self.config.get('dates.sampler_exploration', 1.0)
+        )
         self.email = EmailSender(self.config)
+        self.budget_planner = self._create_budget_planner()
+        self.staleness_filter = self._create_staleness_filter()
+        
+        # Price checks and maintenance never run at the same time, in this
+        # process (scheduler jobs) or across processes (cron entry points)
+        self._run_lock = threading.Lock()
         
         logger.info("Flight bot initialized successfully")
     
+    def close(self):
+        """Release network and database connections"""
+        self.api.close()
+        if self.writer:
+            self.writer.close()
+        self.db.close()
+    
+    def _create_writer(self) -> Optional[DatabaseWriter]:
+        """Create the background (write-behind) database writer from config"""
+        if not self.config.get('advanced.write_behind.enabled', True):
+            return None
+        
+        return DatabaseWriter(
+            self.db,
+            queue_size=self.config.get('advanced.write_behind.queue_size', 10000),
+            batch_size=self.config.get('advanced.write_behind.batch_size', 1000)
+        )
+    
+    def _create_budget_planner(self) -> Optional[CallBudgetPlanner]:
+        """Create the API call budget planner from config"""
+        monthly_quota = self.config.get('api.budget.monthly_quota')
+        if not monthly_quota:
+            return None
+        
+        return CallBudgetPlanner(
+            self.db,
+            monthly_quota=monthly_quota,
+            daily_quota=self.config.get('api.budget.daily_quota'),
+            check_frequency_hours=self.config.check_frequency_hours,
+            reserve_percent=self.config.get('api.budget.reserve_percent', 10)
+        )
+    
+    def _create_staleness_filter(self) -> Optional[StalenessFilter]:
+        """Create the incremental re-search filter from config"""
+        if not self.config.get('advanced.incremental.enabled', False):
+            return None
+        
+        return StalenessFilter(
+            self.db,
+            min_refresh_hours=self.config.get('advanced.incremental.min_refresh_hours', 6),
+            max_refresh_hours=self.config.get('advanced.incremental.max_refresh_hours', 72),
+            horizon_days=self.config.get('advanced.incremental.horizon_days', 180),
+            volatility_weight=self.config.get('advanced.incremental.volatility_weight', 5.0),
+            threshold=self.config.get('advanced.incremental.staleness_threshold', 1.0)
+        )
+    
+    def _create_cassette(self) -> Optional[Cassette]:
+        """Create the record/replay cassette from config"""
+        if self.config.get('api.replay.mode', 'off') == 'off':
+            return None
+        
+        return Cassette(self.config.get('api.replay.cassette', 'data/cassettes/amadeus.json'))
+    
+    def _create_token_cache(self) -> Optional[TokenCache]:
+        """Create the OAuth token cache from config"""
+        if not self.config.get('api.token_cache.enabled', True):
+            return None
+        
+        return TokenCache(
+            self.config.get('api.token_cache.path', 'data/token.json'),
+            min_ttl_seconds=self.config.get('api.token_cache.min_ttl_seconds', 60)
+        )
+    
+    def _create_transport(self) -> Optional[PooledTransport]:
+        """Create the pooled HTTP transport from config"""
+        if not self.config.get('api.transport.pooled', True):
+            return None
+        
+        try:
+            return PooledTransport(
+                max_connections=self.config.get(
+                    'api.transport.max_connections',
+                    self.config.get('advanced.max_concurrent_searches', 4)
+                ),
+                timeout_seconds=self.config.get('api.transport.timeout_seconds', 30),
+                http2=self.config.get('api.transport.http2', True)
+            )
+        except ImportError as e:
+            logger.warning(f"Pooled transport unavailable, using urllib: {e}")
+            return None
+    
+    def _create_response_cache(self) -> Optional[ResponseCache]:
+        """Create the search response cache from config"""
+        if not self.config.get('api.cache.enabled', True):
+            return None
+        
+        return ResponseCache(
+            ttl_seconds=self.config.get('api.cache.ttl_minutes', 60) * 60,
+            max_entries=self.config.get('api.cache.max_entries', 1000),
+            db_path=self.config.get('api.cache.db_path')
+        )
+    
     def check_prices(self):
         """Main price checking routine"""
+        with self._run_lock, _process_lock(self.config):
+            self._check_prices()
+    
+    def _check_prices(self):
+        """Run one price check (holding the run lock)"""
         logger.info("=" * 60)
         logger.info("Starting price check...")
         logger.info(f"Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info("=" * 60)
         
+        if self.api.cache:
+            self.api.cache.reset_stats()
+        self.api.coalescer.reset()
+        self.api.api_calls = 0
+        self.analyzer.reset_cache()
+        planned_calls = None
+        prefilter_calls = 0
+        
         try:
-            all_offers = []
+            run_budget = self.budget_planner.calls_for_run() if self.budget_planner else None
             
-            # Check each destination
-            for destination in self.config.destinations:
-                logger.info(f"Checking {self.config.origin} → {destination}")
-                
-                offers = self._search_destination(destination)
-                all_offers.extend(offers)
+            # Build the full search grid so all destinations run in parallel
+            search_grid = []
+            for origin in self.config.origins:
+                for destination in self.config.destinations:
+                    logger.info(f"Checking {origin} → {destination}")
+                    search_grid.extend(self._build_search_grid(destination, origin, run_budget))
             
-            if not all_offers:
-                logger.warning("No flight offers found")
-                return
+            if self.staleness_filter:
+                search_grid = self._filter_stale_tasks(search_grid)
+            
+            # Pack before budgeting, so the budget counts actual requests
+            if self.config.get('api.batch_search.enabled', False):
+                search_grid = self._pack_batch_tasks(search_grid)
             
-            logger.info(f"Found {len(all_offers)} total offers")
+            if run_budget is not None:
+                # Calls made while building the grid (prefilter) come out of the budget
+                prefilter_calls = self.api.api_calls
+                search_grid = self._apply_budget(search_grid, run_budget - prefilter_calls)
+                planned_calls = prefilter_calls + len(search_grid)
             
-            # Analyze offers
-            analyzed_offers = []
-            for offer in all_offers:
-                # Add origin/destination to offer
-                offer['origin'] = self.config.origin
+            # In streaming mode offers are analyzed and stored one search
+            # at a time and only the best few are kept in memory
+            batches = self._iter_searches(search_grid)
+            if not self.config.get('advanced.streaming', False):
+                batches = [[offer for batch in batches for offer in batch]]
+            
+            best_offers = []
+            total_offers = 0
+            
+            # Calendar mode keeps the cheapest offer per route, departure
+            # date and trip length (the cells of each route's fare calendar)
+            calendar_cells = {} if self.config.get('email.include_calendar', False) else None
+            
+            for batch in batches:
+                # Analyze offers
+                for offer in batch:
+                    offer.analysis = self.analyzer.analyze_offer(offer)
+                
+                # Store the whole batch (queued for the background
+                # writer when write-behind is on)
+                self._store_price_checks(batch)
+                
+                total_offers += len(batch)
                 
-                # Analyze
-                analysis_result = self.analyzer.analyze_offer(offer)
-                analyzed_offers.append({
-                    **offer,
-                    'analysis': analysis_result
-                })
+                # Keep the best offers seen so far
+                best_offers = self.analyzer.get_best_offers(best_offers + batch, limit=5)
                 
-                # Store in database
-                self._store_price_check(offer, analysis_result)
+                if calendar_cells is not None:
+                    self._collect_calendar_cells(calendar_cells, batch)
+            
+            if not total_offers:
+                logger.warning("No flight offers found")
+                return
+            
+            calendars = self._build_price_calendars(calendar_cells) if calendar_cells else {}
+            if calendars:
+                # Rank the cheapest offer of each cell, one per date pair
+                best_offers = self.analyzer.get_best_offers(
+                    [
+                        offer
+                        for calendar in calendars.values()
+                        for offer in self.analyzer.get_best_calendar_offers(calendar, limit=5)
+                    ],
+                    limit=5
+                )
             
-            # Get best offers
-            best_offers = self.analyzer.get_best_offers(analyzed_offers, limit=5)
+            logger.info(f"Found {total_offers} total offers")
             
             # Log results
             for i, offer in enumerate(best_offers):
-                quality = offer['analysis']['deal_quality']
+                quality = offer.analysis['deal_quality']
                 logger.info(
-                    f"{i+1}. {offer['origin']}→{offer['destination']}: "
-                    f"{offer['price']} {offer['currency']} ({quality})"
+                    f"{i+1}. {offer.origin}→{offer.destination}: "
+                    f"{offer.price} {offer.currency} ({quality})"
                 )
             
             # Check if should send alerts
@@ -94,17 +287,15 @@ class FlightBot:
                 for offer in alertable_offers:
                     self._store_deal(offer)
                 
-                # Send email alert
-                self.email.send_deal_alert(alertable_offers)
+                # Send email alert, with the fare calendar of the best deal's route
+                best_deal = alertable_offers[0]
+                self.email.send_deal_alert(
+                    alertable_offers,
+                    calendar=calendars.get((best_deal.origin, best_deal.destination))
+                )
             else:
                 logger.info("No deals meeting alert criteria")
             
-            # Cleanup old data
-            self.db.cleanup_old_data(
-                detailed_days=self.config.get('advanced.keep_detailed_history_days', 30),
-                aggregate_days=self.config.get('advanced.keep_aggregated_history_days', 365)
-            )
-            
             logger.info("Price check complete!")
             
         except Exception as e:
@@ -112,10 +303,49 @@ class FlightBot:
             
             if self.config.get('advanced.send_error_notifications', True):
                 self._send_error_notification(e)
+        
+        finally:
+            if self.writer:
+                # Everything from this run is on disk before it ends
+                self.writer.flush()
+            
+            if self.api.cassette:
+                self.api.cassette.flush()
+            
+            if self.api.cache:
+                cache_stats = self.api.cache.stats()
+                logger.info(
+                    f"Response cache: {cache_stats['hits']} hits, "
+                    f"{cache_stats['misses']} misses"
+                )
+            logger.info(f"Coalesced duplicate searches: {self.api.coalescer.coalesced}")
+            
+            if self.budget_planner:
+                self.budget_planner.record_usage(self.api.api_calls)
+                logger.info(
+                    f"API calls: planned {planned_calls if planned_calls is not None else 'n/a'} "
+                    f"({prefilter_calls} prefilter), actual {self.api.api_calls}"
+                )
     
-    def _search_destination(self, destination: str) -> List[Dict[str, Any]]:
-        """Search flights for a specific destination"""
-        offers = []
+    def run_maintenance(self):
+        """Roll up expired history and reclaim space (waits for a running price check)"""
+        with self._run_lock, _process_lock(self.config):
+            _maintain_database(self.db, self.config)
+    
+    def _build_search_grid(
+        self,
+        destination: str,
+        origin: Optional[str] = None,
+        run_budget: Optional[int] = None
+    ) -> List[SearchTask]:
+        """
+        Build the list of date/trip-length combinations to search for a destination
+        
+        run_budget (API calls for the whole run, None for unlimited) caps
+        the calls the prefilter may make while building the grid.
+        """
+        origin = origin or self.config.origin
+        tasks = []
         
         # Get date parameters
         search_window_days = self.config.get('dates.search_window_days', 180)
@@ -126,6 +356,7 @@ class FlightBot:
         # Define search dates
         today = datetime.now()
         target_periods = self.config.get('dates.target_periods', [])
+        destination_priority = self.config.get('routes.priorities', {}).get(destination, 1.0)
         
         if target_periods:
             # Search specific target periods
@@ -134,63 +365,492 @@ class FlightBot:
                 end_date = datetime.strptime(period['end_date'], '%Y-%m-%d')
                 
                 # Sample a few dates in the period (to avoid too many API calls)
-                search_dates = self._sample_dates(start_date, end_date, samples=3)
+                window_tasks = self._build_window_tasks(
+                    origin=origin,
+                    destination=destination,
+                    start_date=start_date,
+                    end_date=end_date,
+                    samples=3,
+                    trip_lengths=[trip_length_min, trip_length_max] if flexible else [trip_length_min],
+                    run_budget=run_budget
+                )
                 
-                for dep_date in search_dates:
-                    trip_lengths = [trip_length_min, trip_length_max] if flexible else [trip_length_min]
-                    
-                    for length in trip_lengths:
-                        ret_date = dep_date + timedelta(days=length)
-                        
-                        flight_offers = self.api.search_flights(
-                            origin=self.config.origin,
-                            destination=destination,
-                            departure_date=dep_date,
-                            return_date=ret_date,
-                            max_results=5
-                        )
-                        
-                        # Add metadata
-                        for offer in flight_offers:
-                            offer['destination'] = destination
-                            offer['departure_date'] = dep_date.strftime('%Y-%m-%d')
-                            offer['return_date'] = ret_date.strftime('%Y-%m-%d')
-                            offer['trip_length'] = length
-                        
-                        offers.extend(flight_offers)
+                period_label = period.get('label', period['start_date'])
+                period_priority = destination_priority * period.get('priority', 1.0)
+                tasks.extend(
+                    task._replace(period=period_label, priority=period_priority)
+                    for task in window_tasks
+                )
         else:
             # Search general window
             search_start = today + timedelta(days=14)  # Start 2 weeks from now
             search_end = today + timedelta(days=search_window_days)
             
             # Sample dates to avoid excessive API calls
-            search_dates = self._sample_dates(search_start, search_end, samples=5)
+            window_tasks = self._build_window_tasks(
+                origin=origin,
+                destination=destination,
+                start_date=search_start,
+                end_date=search_end,
+                samples=5,
+                trip_lengths=range(trip_length_min, trip_length_max + 1, 3) if flexible else [trip_length_min],
+                run_budget=run_budget
+            )
+            tasks.extend(task._replace(priority=destination_priority) for task in window_tasks)
+        
+        return tasks
+    
+    def _build_window_tasks(
+        self,
+        origin: str,
+        destination: str,
+        start_date: datetime,
+        end_date: datetime,
+        samples: int,
+        trip_lengths: List[int],
+        run_budget: Optional[int] = None
+    ) -> List[SearchTask]:
+        """Build search tasks for one departure window"""
+        if self.config.get('dates.prefilter.enabled', False):
+            candidates = self._rank_candidate_dates(
+                origin=origin,
+                destination=destination,
+                start_date=start_date,
+                end_date=end_date,
+                trip_lengths=list(trip_lengths),
+                run_budget=run_budget
+            )
+            
+            if candidates:
+                return candidates
+        
+        date_pairs = None
+        
+        if self.config.get('dates.sampler', 'even') == 'adaptive':
+            # Same call budget as even sampling, spent where history suggests deals
+            date_pairs = self.sampler.select(
+                route=f"{origin}-{destination}",
+                start_date=start_date,
+                end_date=end_date,
+                trip_lengths=list(trip_lengths),
+                budget=samples * len(trip_lengths)
+            )
+        
+        if date_pairs is None:
+            date_pairs = [
+                (dep_date, length)
+                for dep_date in self._sample_dates(start_date, end_date, samples=samples)
+                for length in trip_lengths
+            ]
+        
+        return [
+            SearchTask(
+                origin=origin,
+                destination=destination,
+                departure_date=dep_date,
+                return_date=dep_date + timedelta(days=length),
+                trip_length=length
+            )
+            for dep_date, length in date_pairs
+        ]
+    
+    def _rank_candidate_dates(
+        self,
+        origin: str,
+        destination: str,
+        start_date: datetime,
+        end_date: datetime,
+        trip_lengths: List[int],
+        run_budget: Optional[int] = None
+    ) -> List[SearchTask]:
+        """
+        Pick the top-K date pairs worth a full offer search
+        
+        Uses the Amadeus cheapest-date endpoint first, since it ranks by
+        current prices. Without it, the adaptive sampler picks the K pairs
+        (with dates.sampler: adaptive), or else our own price history plus
+        a few unsearched pairs. Returns an empty list if none has data, in
+        which case the caller samples dates blindly.
+        
+        The endpoint is skipped when what is left of run_budget can't pay
+        for the call and at least one search after it.
+        """
+        top_k = self.config.get('dates.prefilter.top_k', 4)
+        candidates = []
+        source = 'cheapest-date endpoint'
+        
+        if run_budget is None or run_budget - self.api.api_calls >= 2:
+            candidates = self.api.search_cheapest_dates(
+                origin=origin,
+                destination=destination,
+                departure_start=start_date,
+                departure_end=end_date,
+                trip_length_min=min(trip_lengths),
+                trip_length_max=max(trip_lengths)
+            )
+        else:
+            logger.info(f"Prefilter: skipping cheapest-date call for {origin} → {destination}, run budget spent")
+        
+        if not candidates and self.config.get('dates.sampler', 'even') == 'adaptive':
+            date_pairs = self.sampler.select(
+                route=f"{origin}-{destination}",
+                start_date=start_date,
+                end_date=end_date,
+                trip_lengths=trip_lengths,
+                budget=top_k
+            ) or []
+            candidates = [
+                {'departure_date': dep_date, 'return_date': dep_date + timedelta(days=length)}
+                for dep_date, length in date_pairs
+            ]
+            source = 'adaptive sampler'
+        elif not candidates:
+            candidates = self._history_candidates(
+                route=f"{origin}-{destination}",
+                start_date=start_date,
+                end_date=end_date,
+                trip_lengths=trip_lengths,
+                top_k=top_k
+            )
+            source = 'price history'
+        
+        if candidates:
+            logger.info(
+                f"Prefilter: {origin} → {destination} {start_date:%Y-%m-%d} to {end_date:%Y-%m-%d}, "
+                f"top {min(top_k, len(candidates))} dates picked by {source}"
+            )
+        
+        return [
+            SearchTask(
+                origin=origin,
+                destination=destination,
+                departure_date=candidate['departure_date'],
+                return_date=candidate['return_date'],
+                trip_length=(candidate['return_date'] - candidate['departure_date']).days
+            )
+            for candidate in candidates[:top_k]
+        ]
+    
+    def _history_candidates(
+        self,
+        route: str,
+        start_date: datetime,
+        end_date: datetime,
+        trip_lengths: List[int],
+        top_k: int
+    ) -> List[Dict[str, datetime]]:
+        """
+        Candidates from our own price history, plus fresh dates to explore
+        
+        History only knows the dates we have already searched, so ranking
+        it alone would search the same top-K every run. Half the slots go
+        to the historically cheapest pairs and the rest to randomly drawn
+        pairs that have never been searched.
+        """
+        history = self.db.get_cheapest_date_pairs(
+            route=route,
+            departure_start=start_date,
+            departure_end=end_date,
+            trip_length_min=min(trip_lengths),
+            trip_length_max=max(trip_lengths),
+            limit=max(1, (top_k + 1) // 2)
+        )
+        
+        if not history:
+            return []
+        
+        candidates = [
+            {
+                'departure_date': datetime.strptime(row['departure_date'], '%Y-%m-%d'),
+                'return_date': datetime.strptime(row['return_date'], '%Y-%m-%d')
+            }
+            for row in history
+        ]
+        
+        searched = {
+            (row['departure_date'], row['trip_length'])
+            for row in self.db.get_date_pair_history(route, start_date, end_date)
+        }
+        unexplored = [
+            (dep_date, length)
+            for dep_date in (
+                start_date + timedelta(days=offset)
+                for offset in range(max(0, (end_date - start_date).days) + 1)
+            )
+            for length in trip_lengths
+            if (dep_date.strftime('%Y-%m-%d'), length) not in searched
+        ]
+        
+        for dep_date, length in random.sample(unexplored, min(len(unexplored), top_k - len(candidates))):
+            candidates.append({
+                'departure_date': dep_date,
+                'return_date': dep_date + timedelta(days=length)
+            })
+        
+        return candidates
+    
+    def _filter_stale_tasks(self, tasks: List[SearchTask]) -> List[SearchTask]:
+        """Keep only the tasks whose last observed fare has gone stale"""
+        now = datetime.now()
+        by_route: Dict[str, List[SearchTask]] = {}
+        
+        for task in tasks:
+            by_route.setdefault(f"{task.origin}-{task.destination}", []).append(task)
+        
+        stale_pairs = {
+            route: self.staleness_filter.select_stale(
+                route,
+                [(task.departure_date, task.return_date) for task in route_tasks],
+                now=now
+            )
+            for route, route_tasks in by_route.items()
+        }
+        
+        stale_tasks = [
+            task for task in tasks
+            if (task.departure_date, task.return_date) in stale_pairs[f"{task.origin}-{task.destination}"]
+        ]
+        
+        logger.info(f"Incremental mode: re-searching {len(stale_tasks)} of {len(tasks)} stale combinations")
+        return stale_tasks
+    
+    def _apply_budget(self, tasks: List[SearchTask], budget: int) -> List[SearchTask]:
+        """Trim the search grid to the run's call budget, by priority"""
+        if len(tasks) <= budget:
+            return tasks
+        
+        groups: Dict[Tuple[str, str, str], List[SearchTask]] = {}
+        priorities: Dict[Tuple[str, str, str], float] = {}
+        
+        for task in tasks:
+            key = (task.origin, task.destination, task.period)
+            groups.setdefault(key, []).append(task)
+            priorities[key] = task.priority
+        
+        groups = {key: self._order_for_budget(group) for key, group in groups.items()}
+        selected = self.budget_planner.allocate(groups, priorities, max(0, budget))
+        
+        logger.warning(
+            f"Search grid trimmed to API budget: {len(selected)} of {len(tasks)} searches"
+        )
+        return selected
+    
+    def _order_for_budget(self, tasks: List[SearchTask]) -> List[SearchTask]:
+        """
+        Order a group's tasks so any prefix is a sensible subset
+        
+        Trip lengths closest to dates.trip_length.preferred_days come first
+        (round-robin), and within a trip length dates are spread across the
+        period rather than taken from its start.
+        """
+        preferred = self.config.get('dates.trip_length.preferred_days', self.config.trip_length_min)
+        
+        by_length: Dict[int, List[SearchTask]] = {}
+        for task in tasks:
+            by_length.setdefault(task.trip_length, []).append(task)
+        
+        queues = [
+            deque(by_length[length][i] for i in self._spread_order(len(by_length[length])))
+            for length in sorted(by_length, key=lambda length: (abs(length - preferred), length))
+        ]
+        
+        ordered = []
+        while queues:
+            for queue in list(queues):
+                ordered.append(queue.popleft())
+                if not queue:
+                    queues.remove(queue)
+        
+        return ordered
+    
+    @staticmethod
+    def _spread_order(n: int) -> List[int]:
+        """Indices 0..n-1 ordered so every prefix is spread across the range"""
+        if n <= 2:
+            return list(range(n))
+        
+        order = [0, n - 1]
+        intervals = deque([(0, n - 1)])
+        
+        while intervals:
+            low, high = intervals.popleft()
+            if high - low < 2:
+                continue
+            mid = (low + high) // 2
+            order.append(mid)
+            intervals.append((low, mid))
+            intervals.append((mid, high))
+        
+        return order
+    
+    def _pack_batch_tasks(self, tasks: List[SearchTask]) -> List[SearchTask]:
+        """
+        Merge tasks into fewer batch searches
+        
+        Tasks for the same destination, trip length and target period whose
+        departure dates fit in one +/- date window are merged, and their origins are
+        packed as alternative origin airports (up to 3 airports per request).
+        
+        The window applies to both legs, so a request can return trips up
+        to twice the window shorter or longer than its trip length; the
+        window is narrowed per trip length to keep those within the
+        configured minimum and maximum.
+        """
+        max_window = min(self.config.get('api.batch_search.date_window_days', 3), MAX_DATE_WINDOW_DAYS)
+        trip_length_min = self.config.trip_length_min
+        trip_length_max = self.config.trip_length_max
+        airports_per_request = MAX_ALTERNATIVE_AIRPORTS + 1
+        
+        # Keep target periods apart so the budget can still allocate by period
+        groups: Dict[Tuple[str, int, str], List[SearchTask]] = {}
+        for task in tasks:
+            groups.setdefault((task.destination, task.trip_length, task.period), []).append(task)
+        
+        packed = []
+        for (destination, trip_length, period), group in groups.items():
+            group.sort(key=lambda t: (t.departure_date, t.origin))
+            date_window = max(0, min(
+                max_window,
+                (trip_length - trip_length_min) // 2,
+                (trip_length_max - trip_length) // 2
+            ))
             
-            for dep_date in search_dates:
-                trip_lengths = range(trip_length_min, trip_length_max + 1, 3) if flexible else [trip_length_min]
+            while group:
+                first_date = group[0].departure_date
+                in_window = [
+                    t for t in group
+                    if (t.departure_date - first_date).days <= 2 * date_window
+                ]
+                group = group[len(in_window):]
+                
+                last_date = in_window[-1].departure_date
+                centre = first_date + timedelta(days=(last_date - first_date).days // 2)
                 
-                for length in trip_lengths:
-                    ret_date = dep_date + timedelta(days=length)
-                    
-                    flight_offers = self.api.search_flights(
-                        origin=self.config.origin,
+                origins = list(dict.fromkeys(t.origin for t in in_window))
+                for i in range(0, len(origins), airports_per_request):
+                    chunk = origins[i:i + airports_per_request]
+                    packed.append(SearchTask(
+                        origin=chunk[0],
                         destination=destination,
-                        departure_date=dep_date,
-                        return_date=ret_date,
-                        max_results=5
-                    )
-                    
-                    # Add metadata
-                    for offer in flight_offers:
-                        offer['destination'] = destination
-                        offer['departure_date'] = dep_date.strftime('%Y-%m-%d')
-                        offer['return_date'] = ret_date.strftime('%Y-%m-%d')
-                        offer['trip_length'] = length
-                    
-                    offers.extend(flight_offers)
-        
-        logger.info(f"Found {len(offers)} offers for {destination}")
-        return offers
+                        departure_date=centre,
+                        return_date=centre + timedelta(days=trip_length),
+                        trip_length=trip_length,
+                        date_window=date_window,
+                        alternative_origins=tuple(chunk[1:]),
+                        period=period,
+                        priority=max(t.priority for t in in_window)
+                    ))
+        
+        logger.info(f"Packed {len(tasks)} searches into {len(packed)} batch requests")
+        return packed
+    
+    def _iter_searches(self, tasks: List[SearchTask]) -> Iterator[List[FlightOffer]]:
+        """
+        Run a grid of searches (concurrently if configured) and yield the
+        offers of each search in task order
+        
+        Only a small window of searches is in flight at once, so completed
+        results don't pile up while the caller processes earlier ones.
+        """
+        max_workers = self.config.get('advanced.max_concurrent_searches', 4)
+        
+        if max_workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield self._run_search(task)
+            return
+        
+        window = max_workers * 2
+        
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(tasks)),
+            thread_name_prefix='flight-search'
+        ) as executor:
+            pending = deque()
+            task_iter = iter(tasks)
+            
+            for task in islice(task_iter, window):
+                pending.append(executor.submit(self._run_search, task))
+            
+            while pending:
+                flight_offers = pending.popleft().result()
+                
+                for task in islice(task_iter, 1):
+                    pending.append(executor.submit(self._run_search, task))
+                
+                yield flight_offers
+    
+    def _run_search(self, task: SearchTask) -> List[FlightOffer]:
+        """Run a single search and tag the offers with its metadata"""
+        if task.date_window or task.alternative_origins:
+            # Batch results carry their own route and dates
+            return self.api.search_flights_batch(
+                origin=task.origin,
+                destination=task.destination,
+                departure_date=task.departure_date,
+                return_date=task.return_date,
+                date_window_days=task.date_window,
+                alternative_origins=list(task.alternative_origins),
+                max_results=5
+            )
+        
+        flight_offers = self.api.search_flights(
+            origin=task.origin,
+            destination=task.destination,
+            departure_date=task.departure_date,
+            return_date=task.return_date,
+            max_results=5
+        )
+        
+        # Add metadata
+        departure_date = task.departure_date.strftime('%Y-%m-%d')
+        return_date = task.return_date.strftime('%Y-%m-%d')
+        
+        for offer in flight_offers:
+            offer.origin = task.origin
+            offer.destination = task.destination
+            offer.departure_date = departure_date
+            offer.return_date = return_date
+            offer.trip_length = task.trip_length
+        
+        return flight_offers
+    
+    @staticmethod
+    def _collect_calendar_cells(
+        cells: Dict[Tuple[str, str], Dict[Tuple[str, int], FlightOffer]],
+        offers: List[FlightOffer]
+    ):
+        """Keep the cheapest offer per route, departure date and trip length"""
+        for offer in offers:
+            route_cells = cells.setdefault((offer.origin, offer.destination), {})
+            key = (offer.departure_date, offer.trip_length)
+            
+            if key not in route_cells or offer.price < route_cells[key].price:
+                route_cells[key] = offer
+    
+    def _build_price_calendars(
+        self,
+        cells: Dict[Tuple[str, str], Dict[Tuple[str, int], FlightOffer]]
+    ) -> Dict[Tuple[str, str], PriceCalendar]:
+        """Build a fare calendar per (origin, destination) from collected cells"""
+        calendars = {}
+        
+        try:
+            for route, route_cells in cells.items():
+                departure_dates = [
+                    datetime.strptime(departure_date, '%Y-%m-%d')
+                    for departure_date, _ in route_cells
+                ]
+                calendars[route] = PriceCalendar.from_offers(
+                    route_cells.values(),
+                    departure_start=min(departure_dates),
+                    departure_end=max(departure_dates),
+                    trip_lengths=sorted({trip_length for _, trip_length in route_cells})
+                )
+        except ImportError as e:
+            logger.warning(f"Fare calendar unavailable: {e}")
+            return {}
+        
+        return calendars
     
     def _sample_dates(self, start: datetime, end: datetime, samples: int) -> List[datetime]:
         """Sample evenly spaced dates from a range"""
@@ -207,43 +867,51 @@ class FlightBot:
         step = total_days / (samples - 1) if samples > 1 else 0
         return [start + timedelta(days=int(i * step)) for i in range(samples)]
     
-    def _store_price_check(self, offer: Dict[str, Any], analysis: Dict[str, Any]):
-        """Store price check in database"""
+    def _store_price_checks(self, offers: List[FlightOffer]):
+        """Store price checks in database"""
+        # Stamped now, not when the background writer gets to them
+        checked_at = datetime.now()
+        
         try:
-            self.db.add_price_check({
-                'origin': offer.get('origin'),
-                'destination': offer.get('destination'),
-                'departure_date': offer.get('departure_date'),
-                'return_date': offer.get('return_date'),
-                'trip_length': offer.get('trip_length'),
-                'price': offer.get('price'),
-                'currency': offer.get('currency'),
-                'stops': offer.get('total_stops', 0),
-                'airlines': offer.get('outbound', {}).get('airlines', []),
-                'connections': offer.get('outbound', {}).get('connections', []),
-                'raw_offer': offer
-            })
+            (self.writer or self.db).add_price_checks(
+                {
+                    'origin': offer.origin,
+                    'destination': offer.destination,
+                    'departure_date': offer.departure_date,
+                    'return_date': offer.return_date,
+                    'trip_length': offer.trip_length,
+                    'price': offer.price,
+                    'currency': offer.currency,
+                    'stops': offer.total_stops,
+                    'airlines': offer.outbound.airlines,
+                    'connections': offer.outbound.connections,
+                    'raw_offer': offer.to_dict(),
+                    'checked_at': checked_at
+                }
+                for offer in offers
+            )
         except Exception as e:
-            logger.error(f"Error storing price check: {e}")
+            logger.error(f"Error storing price checks: {e}")
     
-    def _store_deal(self, offer: Dict[str, Any]):
+    def _store_deal(self, offer: FlightOffer):
         """Store deal in database"""
         try:
-            analysis = offer['analysis']
+            analysis = offer.analysis
             
-            self.db.add_deal({
-                'origin': offer.get('origin'),
-                'destination': offer.get('destination'),
-                'departure_date': offer.get('departure_date'),
-                'return_date': offer.get('return_date'),
-                'price': offer.get('price'),
-                'currency': offer.get('currency'),
+            (self.writer or self.db).add_deal({
+                'origin': offer.origin,
+                'destination': offer.destination,
+                'departure_date': offer.departure_date,
+                'return_date': offer.return_date,
+                'price': offer.price,
+                'currency': offer.currency,
                 'discount_percent': analysis.get('discount_percent'),
                 'deal_quality': analysis.get('deal_quality'),
-                'outbound': offer.get('outbound'),
-                'inbound': offer.get('inbound'),
-                'booking_link': offer.get('booking_link'),
-                'notified': True
+                'outbound': offer.outbound.to_dict(),
+                'inbound': offer.inbound.to_dict(),
+                'booking_link': offer.booking_link,
+                'notified': True,
+                'found_at': datetime.now()
             })
         except Exception as e:
             logger.error(f"Error storing deal: {e}")
@@ -263,7 +931,44 @@ class FlightBot:
 def run_once(config_path: str = "config.yaml"):
     """Run price check once and exit"""
     bot = FlightBot(config_path)
-    bot.check_prices()
+    
+    try:
+        bot.check_prices()
+    finally:
+        bot.close()
+
+
+def _process_lock(config) -> ProcessLock:
+    """Lock shared by every process checking prices or maintaining the database"""
+    return ProcessLock(f"{config.database_path}.lock")
+
+
+def _maintain_database(db: Database, config):
+    """Roll up expired history and reclaim space"""
+    logger.info("Running database maintenance...")
+    
+    try:
+        db.run_maintenance(
+            detailed_days=config.get('advanced.keep_detailed_history_days', 30),
+            aggregate_days=config.get('advanced.keep_aggregated_history_days', 365),
+            max_vacuum_pages=config.get('advanced.maintenance.max_vacuum_pages', 2000)
+        )
+    except Exception as e:
+        logger.error(f"Error during maintenance: {e}", exc_info=True)
+
+
+def run_maintenance(config_path: str = "config.yaml"):
+    """Run database maintenance once and exit (needs only the database)"""
+    config = get_config(config_path)
+    
+    # Open the database under the lock too: migrations run on open
+    with _process_lock(config):
+        db = Database(db_path=config.database_path)
+        
+        try:
+            _maintain_database(db, config)
+        finally:
+            db.close()
 
 
 def run_continuous(config_path: str = "config.yaml"):
@@ -287,6 +992,20 @@ def run_continuous(config_path: str = "config.yaml"):
         replace_existing=True
     )
     
+    # Database maintenance runs on its own schedule, off the price check
+    # path: offset by half a check interval so the two don't fire together
+    # (and the run lock makes it wait for a check that is still running)
+    scheduler.add_job(
+        bot.run_maintenance,
+        trigger=IntervalTrigger(
+            hours=bot.config.get('advanced.maintenance.interval_hours', 24),
+            start_date=datetime.now() + timedelta(hours=check_hours / 2)
+        ),
+        id='maintenance',
+        name='Database maintenance',
+        replace_existing=True
+    )
+    
     # Run first check immediately
     bot.check_prices()
     
@@ -295,3 +1014,5 @@ def run_continuous(config_path: str = "config.yaml"):
         scheduler.start()
     except (KeyboardInterrupt, SystemExit):
         logger.info("Scheduler stopped")
+    finally:
+        bot.close()
@@ -0,0 +1,184 @@
+"""
+KLL quantile sketch - mergeable, bounded-size summary of a price distribution
+"""
+
+import math
+import random
+import struct
+from typing import Iterable, List, Optional, Tuple
+
+_HEADER = struct.Struct('<BHQdd')  # version, k, count, min, max
+_FORMAT_VERSION = 1
+
+
+class KLLSketch:
+    """
+    KLL sketch (Karnin, Lang, Liberty 2016) for approximate quantiles
+
+    Values are kept in a stack of compactors; an item at level h stands for
+    2**h original values. When a level fills up it is sorted and every
+    other item is promoted to the next level, so the sketch keeps
+    O(k log n) values with rank error of roughly 1.7 / k. Sketches of the
+    same k merge losslessly with respect to that bound, so daily sketches
+    can be rolled up into monthly ones.
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        Args:
+            k: Accuracy parameter (bigger = more accurate and larger)
+            seed: Random seed for compaction (for reproducible sketches)
+        """
+        self.k = k
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self._compactors: List[List[float]] = [[]]
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _capacity(self, level: int) -> int:
+        """Items a level may hold before it is compacted"""
+        depth = len(self._compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(compactor) for compactor in self._compactors)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(level) for level in range(len(self._compactors)))
+
+    def update(self, value: float):
+        """Add one value"""
+        value = float(value)
+        self.count += 1
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+        self._compactors[0].append(value)
+        if self._size() >= self._max_size():
+            self._compress()
+
+    def extend(self, values: Iterable[float]):
+        """Add many values"""
+        for value in values:
+            self.update(value)
+
+    def merge(self, other: 'KLLSketch'):
+        """Fold another sketch into this one"""
+        if other.count == 0:
+            return
+
+        while len(self._compactors) < len(other._compactors):
+            self._compactors.append([])
+
+        for level, compactor in enumerate(other._compactors):
+            self._compactors[level].extend(compactor)
+
+        self.count += other.count
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+        while self._size() >= self._max_size():
+            self._compress()
+
+    def _compress(self):
+        """Compact the lowest full level into the one above it"""
+        for level in range(len(self._compactors)):
+            compactor = self._compactors[level]
+
+            if len(compactor) < self._capacity(level):
+                continue
+
+            if level + 1 == len(self._compactors):
+                self._compactors.append([])
+
+            compactor.sort()
+            # An odd item out stays behind at this level
+            keep = [compactor.pop()] if len(compactor) % 2 else []
+            offset = self._rng.randint(0, 1)
+
+            self._compactors[level + 1].extend(compactor[offset::2])
+            self._compactors[level] = keep
+            return
+
+    def _weighted_values(self) -> List[Tuple[float, int]]:
+        """All retained values with their weights, sorted by value"""
+        return sorted(
+            (value, 1 << level)
+            for level, compactor in enumerate(self._compactors)
+            for value in compactor
+        )
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of values <= value (0 to 1)"""
+        if self.count == 0:
+            return 0.0
+
+        weight = sum(
+            (1 << level) * sum(1 for item in compactor if item <= value)
+            for level, compactor in enumerate(self._compactors)
+        )
+        return min(weight / self.count, 1.0)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), or None if empty"""
+        if self.count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+
+        target = q * self.count
+        cumulative = 0
+        for value, weight in self._weighted_values():
+            cumulative += weight
+            if cumulative >= target:
+                return value
+
+        return self.max
+
+    def to_bytes(self) -> bytes:
+        """Serialize (for storing in a BLOB column)"""
+        levels = [len(compactor) for compactor in self._compactors]
+        values = [value for compactor in self._compactors for value in compactor]
+
+        return b''.join([
+            _HEADER.pack(
+                _FORMAT_VERSION, self.k, self.count,
+                self.min if self.min is not None else math.nan,
+                self.max if self.max is not None else math.nan
+            ),
+            struct.pack(f'<H{len(levels)}I', len(levels), *levels),
+            struct.pack(f'<{len(values)}d', *values)
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'KLLSketch':
+        """Deserialize a sketch written by to_bytes()"""
+        version, k, count, min_value, max_value = _HEADER.unpack_from(data, 0)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported sketch format version: {version}")
+
+        offset = _HEADER.size
+        (num_levels,) = struct.unpack_from('<H', data, offset)
+        offset += 2
+        levels = struct.unpack_from(f'<{num_levels}I', data, offset)
+        offset += 4 * num_levels
+        values = struct.unpack_from(f'<{sum(levels)}d', data, offset)
+
+        sketch = cls(k=k)
+        sketch.count = count
+        sketch.min = None if math.isnan(min_value) else min_value
+        sketch.max = None if math.isnan(max_value) else max_value
+        sketch._compactors = []
+
+        start = 0
+        for size in levels:
+            sketch._compactors.append(list(values[start:start + size]))
+            start += size
+
+        return sketch
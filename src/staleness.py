@@ -0,0 +1,88 @@
+"""
+Staleness tracking - decides which date combinations are due for a re-search
+"""
+
+import logging
+import math
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from src.database import Database
+
+logger = logging.getLogger(__name__)
+
+
+class StalenessFilter:
+    """
+    Skips date combinations whose last observed fare is still fresh
+
+    A combination's refresh interval grows linearly from min_refresh_hours
+    for imminent departures to max_refresh_hours for departures
+    horizon_days or more away. Volatile fares (high coefficient of
+    variation) go stale faster. A combination is re-searched once
+    age / refresh_interval * (1 + volatility_weight * cv) reaches the
+    threshold; combinations never seen before are always searched.
+    """
+
+    def __init__(
+        self,
+        database: Database,
+        min_refresh_hours: float = 6,
+        max_refresh_hours: float = 72,
+        horizon_days: int = 180,
+        volatility_weight: float = 5.0,
+        threshold: float = 1.0
+    ):
+        self.db = database
+        self.min_refresh_hours = min_refresh_hours
+        self.max_refresh_hours = max_refresh_hours
+        self.horizon_days = horizon_days
+        self.volatility_weight = volatility_weight
+        self.threshold = threshold
+
+    def refresh_interval_hours(self, departure_date: datetime, now: datetime) -> float:
+        """How long a fare for this departure stays fresh"""
+        days_out = max(0.0, (departure_date - now).total_seconds() / 86400)
+        fraction = min(days_out / self.horizon_days, 1.0)
+        return self.min_refresh_hours + (self.max_refresh_hours - self.min_refresh_hours) * fraction
+
+    def staleness(
+        self,
+        observation: Optional[Dict[str, float]],
+        departure_date: datetime,
+        now: datetime
+    ) -> float:
+        """Expected staleness score of a combination (>= threshold means re-search)"""
+        if observation is None:
+            return math.inf
+
+        last_checked = datetime.fromisoformat(str(observation['last_checked_at']))
+        age_hours = (now - last_checked).total_seconds() / 3600
+
+        mean = observation['avg_price'] or 0
+        variance = max((observation['avg_sq_price'] or 0) - mean * mean, 0.0)
+        cv = math.sqrt(variance) / mean if mean else 0.0
+
+        return age_hours / self.refresh_interval_hours(departure_date, now) * (1 + self.volatility_weight * cv)
+
+    def select_stale(
+        self,
+        route: str,
+        date_pairs: Iterable[Tuple[datetime, datetime]],
+        now: Optional[datetime] = None
+    ) -> Set[Tuple[datetime, datetime]]:
+        """
+        Get the (departure, return) pairs of a route that need re-searching
+        """
+        now = now or datetime.now()
+        date_pairs = list(date_pairs)
+        observations = self.db.get_combination_observations(route, since_departure=now)
+
+        stale = set()
+        for departure_date, return_date in date_pairs:
+            key = (departure_date.strftime('%Y-%m-%d'), return_date.strftime('%Y-%m-%d'))
+            if self.staleness(observations.get(key), departure_date, now) >= self.threshold:
+                stale.add((departure_date, return_date))
+
+        logger.debug(f"{route}: {len(stale)} of {len(date_pairs)} date combinations are stale")
+        return stale
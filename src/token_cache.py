@@ -0,0 +1,85 @@
+"""
+OAuth token cache - reuses the Amadeus access token across process restarts
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    Stores the access token and its expiry in a private (0600) JSON file
+
+    Entries are keyed by a fingerprint of the client id and API host, so a
+    token is never reused for other credentials or another environment.
+    The client secret is not stored.
+    """
+
+    def __init__(self, path: str, min_ttl_seconds: int = 60):
+        """
+        Args:
+            path: Cache file location
+            min_ttl_seconds: Ignore cached tokens expiring sooner than this
+        """
+        self.path = path
+        self.min_ttl_seconds = min_ttl_seconds
+
+    @staticmethod
+    def fingerprint(client_id: str, host: str) -> str:
+        """Cache key for a client id / API host pair"""
+        return hashlib.sha256(f"{client_id}@{host}".encode('utf-8')).hexdigest()
+
+    def load(self, fingerprint: str) -> Optional[Tuple[str, int]]:
+        """
+        Get a cached token that is still valid
+
+        Returns:
+            (access_token, expires_at) or None
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entry = json.load(f).get(fingerprint)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable token cache {self.path}: {e}")
+            return None
+
+        if not entry or entry.get('expires_at', 0) - time.time() < self.min_ttl_seconds:
+            return None
+
+        return entry['access_token'], int(entry['expires_at'])
+
+    def save(self, fingerprint: str, access_token: str, expires_at: int):
+        """Atomically write the token, readable only by the current user"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+
+        # Drop expired tokens of other clients
+        now = time.time()
+        entries = {
+            key: entry for key, entry in entries.items()
+            if isinstance(entry, dict) and entry.get('expires_at', 0) > now
+        }
+        entries[fingerprint] = {'access_token': access_token, 'expires_at': expires_at}
+
+        try:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write token cache {self.path}: {e}")
@@ -0,0 +1,51 @@
+"""Tests for FlightAPI offer parsing"""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+from src.flight_api import FlightAPI
+
+
+def _itinerary(origin, destination, at):
+    return {
+        'duration': 'PT12H',
+        'segments': [{
+            'carrierCode': 'LO',
+            'departure': {'iataCode': origin, 'at': f"{at}T10:00:00"},
+            'arrival': {'iataCode': destination, 'at': f"{at}T22:00:00"}
+        }]
+    }
+
+
+def _offer(offer_id, price, outbound, inbound):
+    return {
+        'id': offer_id,
+        'price': {'total': str(price), 'currency': 'PLN'},
+        'itineraries': [_itinerary(*outbound), _itinerary(*inbound)]
+    }
+
+
+def test_batch_search_drops_open_jaw_offers():
+    api = FlightAPI(api_key='key', api_secret='secret')
+    offers = [
+        _offer('1', 2500, ('WAW', 'GRU', '2026-07-01'), ('GRU', 'WAW', '2026-07-15')),
+        # Packed alternative origins let the return leg land elsewhere
+        _offer('2', 2100, ('WAW', 'GRU', '2026-07-01'), ('GRU', 'KRK', '2026-07-15')),
+        _offer('3', 2300, ('KRK', 'GRU', '2026-07-02'), ('GRU', 'KRK', '2026-07-16')),
+    ]
+    api.client = SimpleNamespace(shopping=SimpleNamespace(
+        flight_offers_search=SimpleNamespace(post=lambda body: SimpleNamespace(data=offers))
+    ))
+
+    results = api.search_flights_batch(
+        origin='WAW',
+        destination='GRU',
+        departure_date=datetime(2026, 7, 1),
+        return_date=datetime(2026, 7, 15),
+        date_window_days=1,
+        alternative_origins=['KRK']
+    )
+
+    assert [offer.id for offer in results] == ['1', '3']
+    assert [(offer.origin, offer.destination) for offer in results] == [('WAW', 'GRU'), ('KRK', 'GRU')]
+    assert all(offer.trip_length == 14 for offer in results)